@@ -9,17 +9,85 @@ class Settings(BaseSettings):
     # Основные настройки бота
     BOT_TOKEN: str = Field(..., description="Токен Telegram бота из .env")
     DEBUG: bool = False
+    TELEGRAM_API_URL: str = ""  # Адрес Bot API сервера (пусто - api.telegram.org)
+    SNIPER_MODE: str = "inline"  # inline - в одном процессе с хендлерами, process - в отдельном процессе
+    IPC_SOCKET_PATH: str = "/tmp/gift_sniper.sock"  # Unix-сокет для связи хендлеров с процессом покупки
     
+    # HTTP-сессия Bot API
+    HTTP_POOL_LIMIT: int = 100  # Максимум одновременных соединений
+    HTTP_POOL_LIMIT_PER_HOST: int = 0  # Максимум соединений с одним хостом (0 - без ограничения)
+    HTTP_DNS_CACHE_TTL: int = 300  # Время жизни DNS-кэша, сек
+    HTTP_KEEPALIVE_TIMEOUT: float = 60.0  # Сколько держать простаивающее соединение, сек
+    HTTP_TIMEOUT: float = 30.0  # Таймаут запроса по умолчанию, сек
+    HTTP_METHOD_TIMEOUTS: str = "getAvailableGifts:5,sendGift:10,sendMessage:10"  # Таймауты методов "метод:сек"
+    HTTP_WARM_CONNECTIONS: int = 4  # Сколько соединений держать прогретыми (0 - без прогрева)
+    HTTP_WARM_INTERVAL: float = 30.0  # Период прогрева, меньше HTTP_KEEPALIVE_TIMEOUT, сек
+    FAST_CATALOG_PARSER: bool = False  # Разбирать getAvailableGifts без моделей aiogram и пропускать неизменившиеся ответы
+
     # База данных
     DATABASE_URL: str = Field(..., description="URL базы данных из .env")
     DB_POOL_SIZE: int = 5
     DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # Сколько ждать свободное соединение пула, сек
+    DB_POOL_RECYCLE: int = 1800  # Пересоздавать соединения старше, сек (PostgreSQL)
+    DB_STATEMENT_CACHE_SIZE: int = 256  # Кэш подготовленных запросов asyncpg (0 - выключен, нужно для pgbouncer)
+    SQLITE_PROFILE: bool = True  # Применять к SQLite профиль ниже (WAL и pragma)
+    SQLITE_JOURNAL_MODE: str = "WAL"  # Читатели не блокируются писателем
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # В WAL безопасно для целостности, fsync только на чекпойнтах
+    SQLITE_BUSY_TIMEOUT: int = 5000  # Сколько ждать блокировку записи, мс
+    SQLITE_MMAP_SIZE: int = 268435456  # Размер отображения файла БД в память, байт
+    SQLITE_CACHE_SIZE: int = -65536  # Кэш страниц соединения (отрицательное - в КиБ)
+    CACHE_RECONCILE_INTERVAL: float = 300.0  # Период сверки кэша автопокупки с БД, сек
+    TOTAL_BALANCE_RECONCILE_INTERVAL: float = 600.0  # Период сверки суммы балансов с SUM(balance), сек
     
     # Логирование
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "logs/bot.log"
     LOG_MAX_BYTES: int = 10 * 1024 * 1024  # 10MB
     LOG_BACKUP_COUNT: int = 5
+    ERROR_DIGEST_INTERVAL: float = 60.0  # Не чаще одной сводки ошибок админу за интервал, сек
+    ERROR_DIGEST_MAX_RECORDS: int = 20  # Сколько разных ошибок попадает в сводку
+
+    # Трассировка дропов
+    TRACING_ENABLED: bool = False  # Писать спаны от обнаружения подарка до покупки
+    TRACE_FILE: str = "logs/trace.jsonl"
+    TRACE_MAX_BYTES: int = 10 * 1024 * 1024  # 10MB
+    TRACE_BACKUP_COUNT: int = 5
+
+    # Метрики
+    METRICS_ENABLED: bool = False  # HTTP эндпоинт /metrics в формате Prometheus
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9100  # Процесс покупки в режиме process слушает METRICS_PORT + 1
+
+    # Опрос каталога подарков
+    POLL_INTERVAL: float = 1.0  # Базовый интервал опроса, сек
+    POLL_JITTER: float = 0.1  # Доля случайного отклонения интервала
+    POLL_BURST_INTERVAL: float = 0.25  # Интервал опроса в burst-режиме, сек
+    POLL_BURST_DURATION: float = 30.0  # Длительность burst-режима после изменения каталога, сек
+    POLL_DROP_WINDOWS: str = ""  # Окна дропов "HH:MM-HH:MM" через запятую (UTC)
+    POLL_MAX_BACKOFF: float = 30.0  # Максимальная пауза при сетевых ошибках, сек
+    POLL_BOT_TOKENS: str = ""  # Доп. токены для опроса через запятую, N ботов опрашивают раз в POLL_INTERVAL / N
+
+    # Лимиты запросов к Telegram API
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_GLOBAL_PER_SECOND: float = 30.0  # Общий лимит запросов в секунду
+    RATE_GLOBAL_BURST: float = 30.0  # Допустимый всплеск общего лимита
+    RATE_CHAT_PER_SECOND: float = 1.0  # Лимит сообщений в один чат в секунду
+    RATE_CHAT_BURST: float = 3.0  # Допустимый всплеск лимита чата
+    RATE_HANDLER_SHARE: float = 0.2  # Доля общего лимита токена для процесса хендлеров при SNIPER_MODE=process, остальное - процессу покупки
+    RATE_MAX_RETRIES: int = 3  # Повторы запроса после retry_after (кроме SendGift - их повторяет RetryPolicy)
+
+    # Рассылка подарков
+    DISTRIBUTION_CONCURRENCY: int = 10  # Сколько пользователей обрабатывается параллельно
+    ALLOCATION_POLICY: str = "round_robin"  # round_robin, priority или first_come
+    ALLOCATION_PRIORITY_TIERS: str = "10000,1000"  # Пороги баланса уровней для политики priority
+    GIFT_COOLDOWN_SECONDS: float = 60.0  # Минимальный интервал между рассылками одного подарка, сек
+    SEND_DEADLINE: float = 300.0  # Дедлайн отправки подарков дропа от момента планирования, сек
+    SEND_RETRY_BASE_DELAY: float = 0.5  # Первая задержка повтора отправки, сек
+    SEND_RETRY_MAX_DELAY: float = 10.0  # Максимальная задержка повтора отправки, сек
+    SEND_RETRY_JITTER: float = 0.2  # Доля случайного отклонения задержки повтора
+    NOTIFY_DIGEST_INTERVAL: float = 5.0  # Окно сводного уведомления пользователя о покупках, сек
+    NOTIFY_FUNDS_COOLDOWN: float = 3600.0  # Не повторять уведомление о нехватке средств чаще, сек
 
     class Config:
         env_file = ".env"
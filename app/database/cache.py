@@ -0,0 +1,176 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from app.database.crud.gift_sql import get_active_purchase_settings
+from app.services.subscription_index import SubscriptionIndex, subscription_index
+
+# Слушатель изменений кэша: (операция, аргументы хука)
+CacheListener = Callable[[str, Dict[str, Any]], None]
+
+
+@dataclass
+class CachedSubscription:
+    """Включенные настройки автопокупки вместе с балансом пользователя"""
+    id: int
+    user_id: int
+    min_price: int
+    max_price: int
+    supply_limit: int
+    purchase_cycles: int
+    balance: int
+    is_enabled: bool = True
+
+
+class PurchaseSettingsCache:
+    """Write-through проекция включенных настроек автопокупки и балансов
+
+    Загружается при старте, обновляется хуками CRUD после коммита и
+    периодически сверяется с БД. Горячий путь рассылки читает ее без I/O.
+    """
+
+    def __init__(self, index: SubscriptionIndex):
+        self.index = index
+        self.loaded = False
+        self._entries: Dict[int, CachedSubscription] = {}
+        self._touched: Optional[Set[int]] = None  # Изменения во время сверки
+        self._listeners: List[CacheListener] = []
+
+    def add_listener(self, listener: CacheListener) -> None:
+        """Подписаться на изменения, применяемые хуками CRUD"""
+        self._listeners.append(listener)
+
+    def _notify(self, op: str, **data: Any) -> None:
+        for listener in self._listeners:
+            try:
+                listener(op, data)
+            except Exception as e:
+                logger.error(f"Ошибка слушателя кэша настроек автопокупки: {e}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int) -> Optional[CachedSubscription]:
+        """Получить подписку пользователя"""
+        return self._entries.get(user_id)
+
+    def active(self) -> List[CachedSubscription]:
+        """Все включенные подписки в порядке БД"""
+        return sorted(self._entries.values(), key=lambda entry: entry.id)
+
+    def _touch(self, user_id: int) -> None:
+        if self._touched is not None:
+            self._touched.add(user_id)
+
+    def _build(self, rows: Iterable) -> Dict[int, CachedSubscription]:
+        return {
+            settings.user_id: CachedSubscription(
+                id=settings.id,
+                user_id=settings.user_id,
+                min_price=settings.min_price,
+                max_price=settings.max_price,
+                supply_limit=settings.supply_limit,
+                purchase_cycles=settings.purchase_cycles,
+                balance=balance
+            )
+            for settings, balance in rows
+        }
+
+    async def load(self) -> None:
+        """Загрузить проекцию из БД"""
+        rows = await get_active_purchase_settings()
+        if rows is None:
+            raise RuntimeError("Failed to load active purchase settings")
+        self._entries = self._build(rows)
+        self.index.load(self._entries.values())
+        self.loaded = True
+        logger.info(f"Кэш настроек автопокупки загружен: {len(self)} пользователей")
+
+    async def reconcile(self) -> int:
+        """Сверить проекцию с БД и исправить расхождения
+
+        :return: Количество исправленных записей
+        """
+        self._touched = set()
+        try:
+            rows = await get_active_purchase_settings()
+            if rows is None:
+                return 0
+            fresh = self._build(rows)
+        finally:
+            touched, self._touched = self._touched, None
+
+        # Записи, измененные хуками во время чтения, новее прочитанных
+        for user_id in touched:
+            if user_id in self._entries:
+                fresh[user_id] = self._entries[user_id]
+            else:
+                fresh.pop(user_id, None)
+
+        drift = sum(1 for user_id in fresh.keys() | self._entries.keys() if fresh.get(user_id) != self._entries.get(user_id))
+        if drift:
+            logger.warning(f"Кэш настроек автопокупки расходился с БД в {drift} записях")
+            self._entries = fresh
+            self.index.load(self._entries.values())
+        return drift
+
+    async def run_reconciler(self, interval: float) -> None:
+        """Периодическая сверка с БД"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Ошибка сверки кэша настроек автопокупки: {e}")
+
+    def apply_settings(
+        self,
+        settings_id: int,
+        user_id: int,
+        balance: int,
+        is_enabled: bool,
+        min_price: int,
+        max_price: int,
+        supply_limit: int,
+        purchase_cycles: int
+    ) -> None:
+        """Хук после коммита настроек автопокупки"""
+        self._touch(user_id)
+        self._notify(
+            "settings",
+            settings_id=settings_id,
+            user_id=user_id,
+            balance=balance,
+            is_enabled=is_enabled,
+            min_price=min_price,
+            max_price=max_price,
+            supply_limit=supply_limit,
+            purchase_cycles=purchase_cycles
+        )
+        self.index.upsert(user_id, is_enabled, min_price, max_price, supply_limit)
+        if not is_enabled:
+            self._entries.pop(user_id, None)
+            return
+        self._entries[user_id] = CachedSubscription(
+            id=settings_id,
+            user_id=user_id,
+            min_price=min_price,
+            max_price=max_price,
+            supply_limit=supply_limit,
+            purchase_cycles=purchase_cycles,
+            balance=balance
+        )
+
+    def apply_balance(self, user_id: int, balance: int) -> None:
+        """Хук после коммита нового баланса пользователя"""
+        self._touch(user_id)
+        self._notify("balance", user_id=user_id, balance=balance)
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            entry.balance = balance
+
+
+# Общий кэш процесса
+purchase_cache = PurchaseSettingsCache(subscription_index)
@@ -7,8 +7,11 @@ from decimal import Decimal
 
 from app.database.models import User, AutoPurchaseSettings, BalanceHistory
 from app.database.engine import get_session
+from app.services.metrics import db_timed
+from app.database.cache import purchase_cache
 
 @logger.catch()
+@db_timed
 async def get_user_settings(user_id: int) -> Optional[AutoPurchaseSettings]:
     """Получить настройки автопокупки пользователя
 
@@ -48,6 +51,7 @@ async def get_user_settings(user_id: int) -> Optional[AutoPurchaseSettings]:
         return settings
    
 @logger.catch()
+@db_timed
 async def update_settings(
     user_id: int,
     is_enabled: bool = None,
@@ -147,6 +151,9 @@ async def update_settings(
             await session.execute(stmt)
             await session.commit()
             logger.info(f"Updated settings for user {user_id}: {update_data}")
+
+            # Обновляем кэш автопокупки только после успешного коммита
+            purchase_cache.apply_settings(current_settings.id, user_id, balance=user.balance, **update_data)
                 
         except SQLAlchemyError as e:
             logger.error(f"Database error while updating settings: {e}")
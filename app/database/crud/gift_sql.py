@@ -5,9 +5,11 @@ from loguru import logger
 
 from app.database.models import AutoPurchaseSettings, User
 from app.database.engine import get_session
+from app.services.metrics import db_timed
 
 
 @logger.catch()
+@db_timed
 async def get_active_purchase_settings():
     """
     Получить все активные настройки автопокупки с балансом пользователя
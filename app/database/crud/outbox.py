@@ -0,0 +1,271 @@
+from sqlalchemy import select, update, insert
+from loguru import logger
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.database.models import PurchaseOutbox, PurchaseState
+from app.database.engine import get_session
+from app.database.crud.user import adjust_total_balance, release_balance, reserve_balance
+from app.services.metrics import db_timed
+from app.database.cache import purchase_cache
+
+
+@logger.catch()
+@db_timed
+async def enqueue_purchases(plans: List[Tuple[int, List[Dict[str, Any]]]], round_id: str) -> Dict[int, int]:
+    """Зарезервировать звезды и записать запланированные покупки в outbox
+
+    Резерв и строки outbox пишутся в одной транзакции, поэтому после
+    перезапуска каждая списанная звезда соответствует строке outbox.
+
+    :param plans: Список пар (ID пользователя, подарки с полями id, price, cycle)
+    :param round_id: ID раунда рассылки
+    :return: Новые балансы пользователей, для которых резерв прошел
+    """
+    reserved: Dict[int, int] = {}
+    async with get_session() as session:
+        rows = []
+        # Балансы обновляем в порядке ID, чтобы параллельные транзакции PostgreSQL не ловили взаимоблокировки
+        for user_id, gifts in sorted(plans, key=lambda plan: plan[0]):
+            amount = sum(gift["price"] for gift in gifts)
+            new_balance = await reserve_balance(session, user_id, amount, adjust_total=False)
+            if new_balance is None:
+                continue
+
+            reserved[user_id] = new_balance
+            rows.extend(
+                {
+                    "round_id": round_id,
+                    "user_id": user_id,
+                    "gift_id": gift["id"],
+                    "price": gift["price"],
+                    "cycle": gift.get("cycle", 0),
+                    "state": PurchaseState.PENDING
+                }
+                for gift in gifts
+            )
+
+        if rows:
+            await session.execute(insert(PurchaseOutbox), rows)
+        await adjust_total_balance(session, -sum(row["price"] for row in rows))
+        await session.commit()
+
+    for user_id, balance in reserved.items():
+        purchase_cache.apply_balance(user_id, balance)
+    logger.info(f"Round {round_id}: enqueued {len(rows)} purchases for {len(reserved)} users")
+    return reserved
+
+@logger.catch()
+@db_timed
+async def claim_pending_purchases(user_id: int) -> List[PurchaseOutbox]:
+    """Забрать ожидающие покупки пользователя в работу
+
+    :param user_id: ID пользователя
+    :return: Покупки в порядке планирования
+    """
+    async with get_session() as session:
+        # На PostgreSQL строки, уже захваченные другим процессом, пропускаются (в SQLite FOR UPDATE опускается)
+        pending = (
+            select(PurchaseOutbox.id)
+            .where(PurchaseOutbox.user_id == user_id, PurchaseOutbox.state == PurchaseState.PENDING)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(PurchaseOutbox)
+            .where(PurchaseOutbox.id.in_(pending.scalar_subquery()))
+            .values(state=PurchaseState.SENDING, attempts=PurchaseOutbox.attempts + 1)
+            .returning(PurchaseOutbox)
+        )
+        result = await session.execute(stmt)
+        purchases = sorted(result.scalars().all(), key=lambda purchase: purchase.id)
+        await session.commit()
+        return purchases
+
+@logger.catch()
+@db_timed
+async def complete_purchase(purchase_id: int, states: Tuple[str, ...] = (PurchaseState.SENDING,)) -> bool:
+    """Отметить покупку отправленной
+
+    Прерванную покупку так подтверждает админ, если подарок дошел.
+
+    :param purchase_id: ID строки outbox
+    :param states: Из каких состояний разрешен переход (админ - только interrupted)
+    :return: True, если покупка была в одном из states
+    """
+    async with get_session() as session:
+        stmt = (
+            update(PurchaseOutbox)
+            .where(PurchaseOutbox.id == purchase_id, PurchaseOutbox.state.in_(states))
+            .values(state=PurchaseState.SENT, last_error=None)
+        )
+        result = await session.execute(stmt)
+        await session.commit()
+    if not result.rowcount:
+        logger.warning(f"Purchase {purchase_id} is not in progress, nothing to complete")
+    return bool(result.rowcount)
+
+@logger.catch()
+@db_timed
+async def fail_purchase(
+    purchase_id: int,
+    error: str,
+    states: Tuple[str, ...] = (PurchaseState.SENDING,)
+) -> bool:
+    """Отметить покупку неудавшейся и вернуть ее стоимость на баланс
+
+    Прерванную покупку так возвращает админ, если подарок не дошел.
+
+    :param purchase_id: ID строки outbox
+    :param error: Текст ошибки
+    :param states: Из каких состояний разрешен переход (админ - только interrupted)
+    :return: True, если звезды возвращены
+    """
+    async with get_session() as session:
+        # Возвращаем звезды только один раз - при переходе из states
+        stmt = (
+            update(PurchaseOutbox)
+            .where(PurchaseOutbox.id == purchase_id, PurchaseOutbox.state.in_(states))
+            .values(state=PurchaseState.FAILED, last_error=error[:500])
+            .returning(PurchaseOutbox.user_id, PurchaseOutbox.price)
+        )
+        result = await session.execute(stmt)
+        row = result.one_or_none()
+        if row is None:
+            logger.warning(f"Purchase {purchase_id} is not in progress, nothing to release")
+            return False
+
+        user_id, price = row
+        new_balance = await release_balance(session, user_id, price)
+        await session.commit()
+
+    purchase_cache.apply_balance(user_id, new_balance)
+    logger.info(f"Purchase {purchase_id} failed, released {price} for user {user_id}")
+    return True
+
+@logger.catch()
+@db_timed
+async def interrupt_purchase(purchase_id: int, error: str) -> bool:
+    """Отметить покупку с неизвестным исходом отправки
+
+    Звезды не возвращаются и подарок не отправляется повторно: покупку
+    подтверждает или возвращает админ.
+
+    :param purchase_id: ID строки outbox
+    :param error: Текст ошибки
+    :return: True, если покупка была в работе
+    """
+    async with get_session() as session:
+        stmt = (
+            update(PurchaseOutbox)
+            .where(PurchaseOutbox.id == purchase_id, PurchaseOutbox.state == PurchaseState.SENDING)
+            .values(state=PurchaseState.INTERRUPTED, last_error=error[:500])
+        )
+        result = await session.execute(stmt)
+        await session.commit()
+    if result.rowcount:
+        logger.warning(f"Purchase {purchase_id} has unknown outcome, waiting for admin decision")
+    return bool(result.rowcount)
+
+@logger.catch()
+@db_timed
+async def resume_pending_purchases() -> Tuple[List[int], List[PurchaseOutbox]]:
+    """Подготовить outbox к работе после перезапуска
+
+    Отправка подарка не идемпотентна: покупка, которая была в работе при
+    остановке, могла уже уйти. Такие покупки не отправляются повторно, а
+    переводятся в interrupted - их подтверждает или возвращает админ.
+
+    :return: ID пользователей с ожидающими покупками и прерванные покупки
+    """
+    async with get_session() as session:
+        stmt = (
+            update(PurchaseOutbox)
+            .where(PurchaseOutbox.state == PurchaseState.SENDING)
+            .values(state=PurchaseState.INTERRUPTED)
+            .returning(PurchaseOutbox)
+        )
+        result = await session.execute(stmt)
+        interrupted = sorted(result.scalars().all(), key=lambda purchase: purchase.id)
+        if interrupted:
+            logger.warning(f"{len(interrupted)} purchases were interrupted by restart, waiting for admin decision")
+
+        stmt = (
+            select(PurchaseOutbox.user_id)
+            .where(PurchaseOutbox.state == PurchaseState.PENDING)
+            .distinct()
+        )
+        result = await session.execute(stmt)
+        user_ids = list(result.scalars().all())
+        await session.commit()
+        return user_ids, interrupted
+
+@logger.catch()
+@db_timed
+async def get_purchase_log(
+    user_id: Optional[int] = None,
+    round_id: Optional[str] = None,
+    state: Optional[str] = None,
+    limit: int = 100
+) -> List[PurchaseOutbox]:
+    """Получить журнал покупок
+
+    :param user_id: Фильтр по пользователю
+    :param round_id: Фильтр по раунду рассылки
+    :param state: Фильтр по состоянию
+    :param limit: Максимальное количество записей
+    :return: Записи outbox, новые первыми
+    """
+    async with get_session() as session:
+        stmt = select(PurchaseOutbox).order_by(PurchaseOutbox.id.desc()).limit(limit)
+        if user_id is not None:
+            stmt = stmt.where(PurchaseOutbox.user_id == user_id)
+        if round_id is not None:
+            stmt = stmt.where(PurchaseOutbox.round_id == round_id)
+        if state is not None:
+            stmt = stmt.where(PurchaseOutbox.state == state)
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
+
+@logger.catch()
+@db_timed
+async def cancel_pending_purchases(
+    error: str,
+    gift_id: Optional[str] = None,
+    round_id: Optional[str] = None
+) -> Dict[int, int]:
+    """Отменить ожидающие покупки и вернуть их стоимость на балансы
+
+    Покупки, уже взятые воркерами, не затрагиваются.
+
+    :param error: Причина отмены
+    :param gift_id: Отменить только покупки этого подарка
+    :param round_id: Отменить только покупки этого раунда
+    :return: Возвращенная сумма по пользователям
+    """
+    async with get_session() as session:
+        stmt = (
+            update(PurchaseOutbox)
+            .where(PurchaseOutbox.state == PurchaseState.PENDING)
+            .values(state=PurchaseState.FAILED, last_error=error[:500])
+            .returning(PurchaseOutbox.user_id, PurchaseOutbox.price)
+        )
+        if gift_id is not None:
+            stmt = stmt.where(PurchaseOutbox.gift_id == gift_id)
+        if round_id is not None:
+            stmt = stmt.where(PurchaseOutbox.round_id == round_id)
+        result = await session.execute(stmt)
+
+        refunds: Dict[int, int] = {}
+        for user_id, price in result.all():
+            refunds[user_id] = refunds.get(user_id, 0) + price
+
+        balances: Dict[int, int] = {}
+        for user_id, amount in sorted(refunds.items()):
+            balances[user_id] = await release_balance(session, user_id, amount, adjust_total=False)
+        await adjust_total_balance(session, sum(refunds.values()))
+        await session.commit()
+
+    for user_id, balance in balances.items():
+        purchase_cache.apply_balance(user_id, balance)
+    if refunds:
+        logger.info(f"Cancelled pending purchases for {len(refunds)} users: {error}")
+    return refunds
@@ -1,14 +1,50 @@
-from sqlalchemy import select, update
+import asyncio
+
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.exc import SQLAlchemyError, NoResultFound
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError, NoResultFound
 from loguru import logger
 from decimal import Decimal
 from typing import Optional
 
-from app.database.models import User, AutoPurchaseSettings, BalanceHistory
+from app.database.models import User, AutoPurchaseSettings, BalanceHistory, BalanceTotal
 from app.database.engine import get_session
+from app.services.metrics import db_timed
+from app.database.cache import purchase_cache
+
+# ID строки с суммой балансов
+BALANCE_TOTAL_ID = 1
+
+
+async def adjust_total_balance(session: AsyncSession, delta: int) -> None:
+    """Изменить сумму балансов в транзакции, изменившей балансы
+
+    Вызывается после UPDATE пользователей: строки пользователей блокируются
+    раньше строки суммы, поэтому порядок блокировок у всех транзакций один.
+
+    :param session: Сессия с незакоммиченным изменением балансов
+    :param delta: На сколько изменилась сумма балансов
+    """
+    if delta == 0:
+        return
+    stmt = (
+        update(BalanceTotal)
+        .where(BalanceTotal.id == BALANCE_TOTAL_ID)
+        .values(total=BalanceTotal.total + delta)
+    )
+    result = await session.execute(stmt)
+    if result.rowcount == 0:
+        # Суммы еще нет - считаем ее по балансам, уже включающим delta
+        total = (await session.execute(select(func.coalesce(func.sum(User.balance), 0)))).scalar_one()
+        try:
+            async with session.begin_nested():
+                session.add(BalanceTotal(id=BALANCE_TOTAL_ID, total=total))
+        except IntegrityError:
+            # Строку параллельно создала другая транзакция, ее сумма нашей delta не содержит
+            await session.execute(stmt)
 
 @logger.catch()
+@db_timed
 async def is_admin(user_id: int) -> bool:
     """Проверка является ли пользователь админом
 
@@ -22,6 +58,7 @@ async def is_admin(user_id: int) -> bool:
         return user and user.admin
 
 @logger.catch()
+@db_timed
 async def get_or_create_user(user_id: int, username: str | None = None) -> User:
     """Получить пользователя или создать нового
 
@@ -63,6 +100,17 @@ async def get_or_create_user(user_id: int, username: str | None = None) -> User:
             session.add(settings)
             await session.commit()
             logger.info(f"Created auto-purchase settings for user: {user_id}")
+
+            purchase_cache.apply_settings(
+                settings.id,
+                user_id,
+                balance=user.balance,
+                is_enabled=settings.is_enabled,
+                min_price=settings.min_price,
+                max_price=settings.max_price,
+                supply_limit=settings.supply_limit,
+                purchase_cycles=settings.purchase_cycles
+            )
         else:
             # Обновляем имя пользователя, если оно изменилось
             if user.username != username:
@@ -73,6 +121,7 @@ async def get_or_create_user(user_id: int, username: str | None = None) -> User:
         return user
 
 @logger.catch()
+@db_timed
 async def update_user_balance(user_id: int, amount: int, telegram_payment_charge_id: str) -> None:
     """Обновить баланс пользователя
 
@@ -85,22 +134,21 @@ async def update_user_balance(user_id: int, amount: int, telegram_payment_charge
 
     async with get_session() as session:
         try:
-            # Проверяем существование пользователя
-            stmt = select(User).where(User.user_id == user_id)
+            # Обновляем баланс одним запросом, без чтения текущего значения
+            stmt = (
+                update(User)
+                .where(User.user_id == user_id)
+                .values(balance=User.balance + amount)
+                .returning(User.balance)
+            )
             result = await session.execute(stmt)
-            user = result.scalar_one_or_none()
+            new_balance = result.scalar_one_or_none()
             
-            if not user:
+            if new_balance is None:
                 logger.error(f"User not found: {user_id}")
                 raise ValueError(f"User not found: {user_id}")
-                
-            # Проверяем, не станет ли баланс отрицательным
-            new_balance = user.balance + amount
-            logger.info(f"Updating balance for user {user_id}: {user.balance} -> {new_balance}")
-                
-            # Обновляем баланс
-            stmt = update(User).where(User.user_id == user_id).values(balance=new_balance)
-            await session.execute(stmt)
+            logger.info(f"Updating balance for user {user_id}: {new_balance - amount} -> {new_balance}")
+            await adjust_total_balance(session, amount)
             
             # Создаем запись в истории баланса
             balance_history = BalanceHistory(
@@ -111,6 +159,7 @@ async def update_user_balance(user_id: int, amount: int, telegram_payment_charge
             session.add(balance_history)
             
             await session.commit()
+            purchase_cache.apply_balance(user_id, new_balance)
             logger.info(f"Successfully updated balance for user {user_id}: {new_balance}")
             logger.info(f"Created balance history record: user_id={user_id}, amount={amount}, charge_id={telegram_payment_charge_id}")
         except Exception as e:
@@ -119,6 +168,7 @@ async def update_user_balance(user_id: int, amount: int, telegram_payment_charge
             raise
 
 @logger.catch()
+@db_timed
 async def get_user_balance(user_id: int) -> int:
     """Получить баланс пользователя
 
@@ -134,6 +184,7 @@ async def get_user_balance(user_id: int) -> int:
         return user.balance 
     
 @logger.catch()
+@db_timed
 async def get_transaction(telegram_payment_charge_id: str):
 
     async with get_session() as session:
@@ -146,6 +197,7 @@ async def get_transaction(telegram_payment_charge_id: str):
         return transaction.scalar().amount
 
 @logger.catch()
+@db_timed
 async def delete_transaction(telegram_payment_charge_id: str) -> int:
     """Удаление транзакции из истории
 
@@ -180,6 +232,7 @@ async def delete_transaction(telegram_payment_charge_id: str) -> int:
             raise
 
 @logger.catch()
+@db_timed
 async def decrease_user_balance(user_id: int, amount: int) -> None:
     """Уменьшение баланса пользователя
 
@@ -189,31 +242,99 @@ async def decrease_user_balance(user_id: int, amount: int) -> None:
     """
     async with get_session() as session:
         try:
-            # Получаем пользователя
-            stmt = select(User).where(User.user_id == user_id)
+            # Списываем только если хватает средств, одним условным UPDATE
+            stmt = (
+                update(User)
+                .where(User.user_id == user_id, User.balance >= amount)
+                .values(balance=User.balance - amount)
+                .returning(User.balance)
+            )
             result = await session.execute(stmt)
-            user = result.scalar_one_or_none()
-
-            if not user:
-                raise ValueError(f"User not found: {user_id}")
+            new_balance = result.scalar_one_or_none()
 
-            # Проверяем баланс
-            if user.balance < amount:
+            if new_balance is None:
+                user = await session.get(User, user_id)
+                if not user:
+                    raise ValueError(f"User not found: {user_id}")
                 raise ValueError(f"Insufficient balance: {user.balance} < {amount}")
 
-            # Обновляем баланс
-            new_balance = user.balance - amount
-            stmt = update(User).where(User.user_id == user_id).values(balance=new_balance)
-            await session.execute(stmt)
+            await adjust_total_balance(session, -amount)
             await session.commit()
+            purchase_cache.apply_balance(user_id, new_balance)
 
-            logger.info(f"Successfully decreased balance for user {user_id}: {user.balance} -> {new_balance}")
+            logger.info(f"Successfully decreased balance for user {user_id}: {new_balance + amount} -> {new_balance}")
 
         except Exception as e:
             logger.error(f"Error decreasing user balance: {e}")
             await session.rollback()
             raise
 
+async def reserve_balance(
+    session: AsyncSession,
+    user_id: int,
+    amount: int,
+    adjust_total: bool = True
+) -> Optional[int]:
+    """Списать звезды под покупки в транзакции вызывающего
+
+    Списание идет одним условным UPDATE ... WHERE balance >= amount, поэтому
+    параллельные покупки, пополнения и возвраты не требуют блокировок.
+    Коммит и обновление кэша балансов - на вызывающем.
+
+    :param session: Сессия, в транзакции которой идет списание
+    :param user_id: ID пользователя
+    :param amount: Сумма резерва
+    :param adjust_total: Сразу изменить сумму балансов (False - вызывающий изменит ее одним запросом)
+    :return: Новый баланс или None, если средств недостаточно
+    """
+    if amount <= 0:
+        raise ValueError("Reservation amount must be positive")
+
+    stmt = (
+        update(User)
+        .where(User.user_id == user_id, User.balance >= amount)
+        .values(balance=User.balance - amount)
+        .returning(User.balance)
+    )
+    result = await session.execute(stmt)
+    new_balance = result.scalar_one_or_none()
+    if new_balance is None:
+        logger.info(f"Not enough balance to reserve {amount} for user {user_id}")
+        return None
+    if adjust_total:
+        await adjust_total_balance(session, -amount)
+    return new_balance
+
+async def release_balance(
+    session: AsyncSession,
+    user_id: int,
+    amount: int,
+    adjust_total: bool = True
+) -> int:
+    """Вернуть на баланс зарезервированные звезды в транзакции вызывающего
+
+    :param session: Сессия, в транзакции которой идет возврат
+    :param user_id: ID пользователя
+    :param amount: Возвращаемая сумма
+    :param adjust_total: Сразу изменить сумму балансов (False - вызывающий изменит ее одним запросом)
+    :return: Новый баланс
+    :raises ValueError: Если пользователь не найден
+    """
+    stmt = (
+        update(User)
+        .where(User.user_id == user_id)
+        .values(balance=User.balance + amount)
+        .returning(User.balance)
+    )
+    result = await session.execute(stmt)
+    new_balance = result.scalar_one_or_none()
+    if new_balance is None:
+        raise ValueError(f"User not found: {user_id}")
+    if adjust_total:
+        await adjust_total_balance(session, amount)
+    return new_balance
+
+# Без db_timed: время запросов уже учтено в delete_transaction и decrease_user_balance
 @logger.catch()
 async def process_refund(user_id: int, telegram_payment_charge_id: str) -> None:
     """Обработка возврата средств
@@ -240,13 +361,56 @@ async def process_refund(user_id: int, telegram_payment_charge_id: str) -> None:
         raise
 
 @logger.catch()
+@db_timed
 async def get_total_balance() -> int:
     """Получить общий баланс всех пользователей
 
+    Читается поддерживаемая сумма, а не балансы всех пользователей.
+
     :return: Общий баланс всех пользователей
     """
     async with get_session() as session:
-        stmt = select(User.balance)
-        result = await session.execute(stmt)
-        balances = result.scalars().all()
-        return sum(balances) if balances else 0
\ No newline at end of file
+        total = await session.scalar(select(BalanceTotal.total).where(BalanceTotal.id == BALANCE_TOTAL_ID))
+        if total is None:
+            total = await session.scalar(select(func.coalesce(func.sum(User.balance), 0)))
+        return total
+
+@logger.catch()
+@db_timed
+async def reconcile_total_balance() -> int:
+    """Сверить сумму балансов с SUM(balance) и исправить расхождение
+
+    Сначала блокируется строка суммы: транзакции, уже изменившие балансы,
+    ждут ее, поэтому SUM и сумма считаются по одному и тому же состоянию.
+
+    :return: Расхождение, которое было исправлено
+    """
+    async with get_session() as session:
+        stmt = (
+            update(BalanceTotal)
+            .where(BalanceTotal.id == BALANCE_TOTAL_ID)
+            .values(total=BalanceTotal.total)
+            .returning(BalanceTotal.total)
+        )
+        stored = (await session.execute(stmt)).scalar_one_or_none()
+        actual = (await session.execute(select(func.coalesce(func.sum(User.balance), 0)))).scalar_one()
+        if stored is None:
+            session.add(BalanceTotal(id=BALANCE_TOTAL_ID, total=actual))
+            await session.commit()
+            logger.info(f"Total balance initialized: {actual}")
+            return 0
+
+        drift = actual - stored
+        if drift:
+            await session.execute(
+                update(BalanceTotal).where(BalanceTotal.id == BALANCE_TOTAL_ID).values(total=actual)
+            )
+            logger.warning(f"Total balance drift {drift}: stored {stored}, actual {actual}")
+        await session.commit()
+        return drift
+
+async def run_total_balance_reconciler(interval: float) -> None:
+    """Периодическая сверка суммы балансов"""
+    while True:
+        await asyncio.sleep(interval)
+        await reconcile_total_balance()
\ No newline at end of file
@@ -1,20 +1,85 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 from sqlalchemy.exc import SQLAlchemyError
 from loguru import logger
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 
 from app.config import settings
 
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """Pragma профиля SQLite из настроек"""
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "temp_store": "MEMORY",
+    }
+
+
+def build_engine(database_url: str = settings.DATABASE_URL) -> AsyncEngine:
+    """Создать движок БД с профилем под диалект
+
+    Для PostgreSQL (postgresql+asyncpg) пул настраивается из Settings, а
+    asyncpg кэширует подготовленные запросы на соединении.
+
+    Для SQLite pragma применяются при открытии каждого соединения, а пул
+    держит постоянный набор соединений aiosqlite без overflow: запись в
+    SQLite все равно идет по одной, а новые соединения теряли бы кэш страниц
+    и платили за pragma заново. Ожидание блокировки записи берет на себя
+    busy_timeout.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "postgresql":
+        return create_async_engine(
+            database_url,
+            echo=settings.DEBUG,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args={
+                "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+                "server_settings": {"application_name": "gift_bot"}
+            }
+        )
+    if url.get_backend_name() != "sqlite" or not settings.SQLITE_PROFILE:
+        return create_async_engine(
+            database_url,
+            echo=settings.DEBUG,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW
+        )
+
+    new_engine = create_async_engine(
+        database_url,
+        echo=settings.DEBUG,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=0
+    )
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return new_engine
+
+
 # Создаем движок базы данных
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_size=settings.DB_POOL_SIZE,
-    max_overflow=settings.DB_MAX_OVERFLOW
-)
+engine = build_engine()
 
 # Создаем фабрику сессий
 async_session = async_sessionmaker(
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, create_engine, DateTime
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, Float, ForeignKey, Index, create_engine, DateTime
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
@@ -6,10 +6,13 @@ from datetime import datetime
 
 Base = declarative_base()
 
+# ID пользователей Telegram не помещаются в INTEGER PostgreSQL, в SQLite INTEGER и так 64-битный
+TelegramId = BigInteger().with_variant(Integer, "sqlite")
+
 class User(Base):
     __tablename__ = "users"
 
-    user_id = Column(Integer, primary_key=True)
+    user_id = Column(TelegramId, primary_key=True, autoincrement=False)
     username = Column(String, nullable=True)
     balance = Column(Integer, default=0)
     admin = Column(Boolean, default=False)
@@ -19,9 +22,13 @@ class User(Base):
 
 class AutoPurchaseSettings(Base):
     __tablename__ = "auto_purchase_settings"
+    __table_args__ = (
+        # Активные настройки читаются каждый раунд
+        Index("ix_auto_purchase_settings_enabled", "is_enabled", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.user_id"))
+    user_id = Column(TelegramId, ForeignKey("users.user_id"), unique=True, index=True)
     is_enabled = Column(Boolean, default=False)
     min_price = Column(Integer, default=0)
     max_price = Column(Integer, default=0)
@@ -32,15 +39,54 @@ class AutoPurchaseSettings(Base):
 
 class BalanceHistory(Base):
     __tablename__ = "balance_history"
+    __table_args__ = (
+        Index("ix_balance_history_user_id_timestamp", "user_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.user_id"))
+    user_id = Column(TelegramId, ForeignKey("users.user_id"))
     amount = Column(Integer)
-    telegram_payment_charge_id = Column(String)
+    telegram_payment_charge_id = Column(String, unique=True, index=True)
     timestamp = Column(DateTime, default=datetime.now)
     
     user = relationship("User", back_populates="balance_history")
 
+class BalanceTotal(Base):
+    """Сумма балансов всех пользователей
+
+    Единственная строка, меняется в тех же транзакциях, что и балансы.
+    """
+    __tablename__ = "balance_totals"
+
+    id = Column(Integer, primary_key=True)
+    total = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class PurchaseState:
+    """Состояния запланированной покупки в outbox"""
+    PENDING = "pending"  # Звезды зарезервированы, ждет отправки
+    SENDING = "sending"  # Взята воркером
+    INTERRUPTED = "interrupted"  # Исход отправки неизвестен (перезапуск, таймаут) - решает админ
+    SENT = "sent"  # Подарок отправлен
+    FAILED = "failed"  # Отправка не удалась, звезды возвращены
+
+class PurchaseOutbox(Base):
+    __tablename__ = "purchase_outbox"
+
+    id = Column(Integer, primary_key=True)
+    round_id = Column(String, index=True)
+    user_id = Column(TelegramId, ForeignKey("users.user_id"), index=True)
+    gift_id = Column(String)
+    price = Column(Integer)
+    cycle = Column(Integer, default=0)
+    state = Column(String, default=PurchaseState.PENDING, index=True)
+    attempts = Column(Integer, default=0)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    user = relationship("User")
+
 # Создаем асинхронный движок для SQLAlchemy
 async def init_db(database_url: str):
     engine = create_async_engine(database_url, echo=True)
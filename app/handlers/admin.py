@@ -5,9 +5,10 @@ from loguru import logger
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.models import User
+from app.database.models import User, PurchaseState
 from app.database.engine import get_session
 from app.database.crud.user import is_admin
+from app.database.crud.outbox import complete_purchase, fail_purchase, get_purchase_log
 from app.config import Settings
 
 settings = Settings()
@@ -58,3 +59,64 @@ async def cmd_admin(message: Message) -> None:
     except Exception as e:
         logger.error(f"Error in admin command: {e}")
         await message.answer("Произошла ошибка. Попробуйте позже.")
+
+
+@router.message(Command("purchase"))
+async def cmd_purchase(message: Message) -> None:
+    """Обработчик команды /purchase - решения по прерванным покупкам"""
+    try:
+        if not await is_admin(message.from_user.id):
+            await message.answer("У вас нет прав администратора")
+            return
+
+        args = message.text.split()
+        if len(args) == 2 and args[1] == "list":
+            purchases = await get_purchase_log(state=PurchaseState.INTERRUPTED, limit=50) or []
+            if not purchases:
+                await message.answer("Прерванных покупок нет")
+                return
+            lines = [f"Прерванные покупки ({len(purchases)}):"]
+            for purchase in purchases:
+                lines.append(
+                    f"#{purchase.id} — подарок {purchase.gift_id} пользователю {purchase.user_id}, "
+                    f"{purchase.price} ⭐, раунд {purchase.round_id}"
+                )
+            await message.answer("\n".join(lines), parse_mode=None)
+            return
+
+        if len(args) != 3 or args[1] not in ("confirm", "refund"):
+            await message.answer(
+                "Использование:\n"
+                "/purchase list - прерванные покупки\n"
+                "/purchase confirm <id> - подарок дошел\n"
+                "/purchase refund <id> - подарок не дошел, вернуть звезды"
+            )
+            return
+
+        try:
+            purchase_id = int(args[2])
+        except ValueError:
+            await message.answer("ID покупки должен быть числом")
+            return
+
+        # Только прерванные покупки: строку в sending еще может отправлять воркер
+        if args[1] == "confirm":
+            done = await complete_purchase(purchase_id, states=(PurchaseState.INTERRUPTED,))
+            answer = f"Покупка #{purchase_id} подтверждена"
+        else:
+            done = await fail_purchase(
+                purchase_id,
+                f"Возврат админом {message.from_user.id}",
+                states=(PurchaseState.INTERRUPTED,)
+            )
+            answer = f"Звезды за покупку #{purchase_id} возвращены"
+
+        if not done:
+            await message.answer(f"Покупка #{purchase_id} не найдена или не прервана")
+            return
+        await message.answer(answer)
+        logger.info(f"Purchase {purchase_id}: {args[1]} by admin {message.from_user.id}")
+
+    except Exception as e:
+        logger.error(f"Error in purchase command: {e}")
+        await message.answer("Произошла ошибка. Попробуйте позже.")
@@ -1,11 +1,17 @@
+from typing import Dict
+
 from loguru import logger
 from notifiers.logging import NotificationHandler
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
 
 from app.config import Settings
+from app.services.rate_limiter import ApiRateScheduler, RateLimitMiddleware
+from app.services.metrics import ApiMetricsMiddleware
+from app.services.http_session import TunedAiohttpSession, parse_method_timeouts
 
 settings = Settings()
 
@@ -25,10 +31,73 @@ logger.add(
 )
 # Create a new memory storage object
 storage = MemoryStorage()
+# Планировщики лимитов по токенам ботов
+_rate_schedulers: Dict[str, ApiRateScheduler] = {}
+
+
+def handler_rate_share() -> float:
+    """Доля общего лимита основного токена у процесса хендлеров
+
+    При SNIPER_MODE=process основной токен используют два процесса, а лимит
+    Telegram у токена один: хендлерам достается RATE_HANDLER_SHARE, процессу
+    покупки - остальное (см. set_rate_share в run_sniper).
+    """
+    return settings.RATE_HANDLER_SHARE if settings.SNIPER_MODE == "process" else 1.0
+
+
+def set_rate_share(token: str, rate_share: float) -> None:
+    """Задать уже созданному боту долю общего лимита токена
+
+    :param token: Токен бота
+    :param rate_share: Доля общего лимита токена
+    """
+    rate_scheduler = _rate_schedulers.get(token)
+    if rate_scheduler is not None:
+        rate_scheduler.set_global_limit(
+            settings.RATE_GLOBAL_PER_SECOND * rate_share,
+            max(1.0, settings.RATE_GLOBAL_BURST * rate_share)
+        )
+
+
+def create_bot(token: str, rate_share: float = 1.0) -> Bot:
+    """Создать бота с указанным токеном и общими настройками
+
+    :param token: Токен бота
+    :param rate_share: Доля общего лимита токена, если токен делят несколько процессов
+    """
+    session = TunedAiohttpSession(
+        api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL) if settings.TELEGRAM_API_URL else PRODUCTION,
+        limit=settings.HTTP_POOL_LIMIT,
+        limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+        dns_cache_ttl=settings.HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        timeout=settings.HTTP_TIMEOUT,
+        method_timeouts=parse_method_timeouts(settings.HTTP_METHOD_TIMEOUTS),
+        warm_connections=settings.HTTP_WARM_CONNECTIONS,
+        warm_interval=settings.HTTP_WARM_INTERVAL
+    )
+    new_bot = Bot(
+        token=token,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+    # Лимиты Telegram действуют на каждый токен отдельно
+    if settings.RATE_LIMIT_ENABLED:
+        rate_scheduler = ApiRateScheduler(
+            global_rate=settings.RATE_GLOBAL_PER_SECOND * rate_share,
+            global_burst=max(1.0, settings.RATE_GLOBAL_BURST * rate_share),
+            chat_rate=settings.RATE_CHAT_PER_SECOND,
+            chat_burst=settings.RATE_CHAT_BURST
+        )
+        _rate_schedulers[token] = rate_scheduler
+        new_bot.session.middleware(RateLimitMiddleware(rate_scheduler, max_retries=settings.RATE_MAX_RETRIES))
+    # Подключаем после лимитов, чтобы мерить сам запрос и видеть каждый ответ 429
+    if settings.METRICS_ENABLED:
+        new_bot.session.middleware(ApiMetricsMiddleware())
+    return new_bot
+
+
 # Create a new bot object with the specified token and parse mode
-bot = Bot(
-    token=settings.BOT_TOKEN,
-    default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-)
+bot = create_bot(settings.BOT_TOKEN, rate_share=handler_rate_share())
 # Create a new dispatcher object with the specified storage
 dp = Dispatcher(storage=storage) 
\ No newline at end of file
@@ -0,0 +1,136 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, List, Optional, Sequence
+
+from loguru import logger
+
+
+class AllocationPolicy(str, Enum):
+    """Политики распределения ограниченного саплая между пользователями"""
+    ROUND_ROBIN = "round_robin"  # По одному циклу каждому пользователю по очереди
+    PRIORITY = "priority"  # Сначала старшие уровни по балансу, внутри уровня - по очереди
+    FIRST_COME = "first_come"  # Все циклы первому пользователю, затем следующему
+
+
+@dataclass
+class Candidate:
+    """Пользователь, претендующий на подарки раунда"""
+    settings: Any
+    balance: int
+    gifts: List[Dict[str, Any]]
+
+    @property
+    def user_id(self) -> int:
+        return self.settings.user_id
+
+
+@dataclass
+class UserPlan:
+    """Запланированные покупки пользователя"""
+    candidate: Candidate
+    gifts: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return sum(gift["price"] for gift in self.gifts)
+
+
+class _State:
+    """Состояние пользователя во время распределения"""
+
+    def __init__(self, candidate: Candidate):
+        self.plan = UserPlan(candidate)
+        self.balance = candidate.balance
+        self.cycles = candidate.settings.purchase_cycles
+        self.cycle = 0
+
+    def run_cycle(self, supply: Dict[str, Optional[int]]) -> bool:
+        """Купить по одному экземпляру подходящих подарков
+
+        :return: True, если в цикле удалось что-то запланировать
+        """
+        if self.cycle >= self.cycles:
+            return False
+
+        planned = False
+        for gift in self.plan.candidate.gifts:
+            left = supply.get(gift["id"])
+            if left is not None and left <= 0:
+                continue
+            if self.balance < gift["price"]:
+                continue
+
+            self.plan.gifts.append({
+                "id": gift["id"],
+                "price": gift["price"],
+                "user_id": self.plan.candidate.user_id,
+                "cycle": self.cycle
+            })
+            self.balance -= gift["price"]
+            if left is not None:
+                supply[gift["id"]] = left - 1
+            planned = True
+
+        self.cycle += 1
+        # Если в цикле ничего не куплено, следующие циклы тоже ничего не дадут
+        if not planned:
+            self.cycle = self.cycles
+        return planned
+
+
+def _round_robin(states: List[_State], supply: Dict[str, Optional[int]]) -> None:
+    active = list(states)
+    while active:
+        active = [state for state in active if state.run_cycle(supply)]
+
+
+def _first_come(states: List[_State], supply: Dict[str, Optional[int]]) -> None:
+    for state in states:
+        while state.run_cycle(supply):
+            pass
+
+
+def _tier(balance: int, thresholds: Sequence[int]) -> int:
+    for index, threshold in enumerate(thresholds):
+        if balance >= threshold:
+            return index
+    return len(thresholds)
+
+
+def allocate_purchases(
+    gifts: List[Dict[str, Any]],
+    candidates: List[Candidate],
+    policy: AllocationPolicy = AllocationPolicy.ROUND_ROBIN,
+    priority_tiers: Sequence[int] = ()
+) -> List[UserPlan]:
+    """Распределить оставшийся саплай подарков между пользователями
+
+    Никогда не планирует больше покупок подарка, чем его remaining_count.
+
+    :param gifts: Подарки раунда
+    :param candidates: Пользователи в порядке очереди (порядок БД)
+    :param policy: Политика распределения
+    :param priority_tiers: Пороги баланса уровней для политики PRIORITY
+    :return: Планы пользователей с хотя бы одной покупкой
+    """
+    supply: Dict[str, Optional[int]] = {gift["id"]: gift["remaining_count"] for gift in gifts}
+    states = [_State(candidate) for candidate in candidates]
+
+    if policy == AllocationPolicy.FIRST_COME:
+        _first_come(states, supply)
+    elif policy == AllocationPolicy.PRIORITY:
+        thresholds = sorted(priority_tiers, reverse=True)
+        tiers: Dict[int, List[_State]] = {}
+        for state in states:
+            tiers.setdefault(_tier(state.balance, thresholds), []).append(state)
+        for tier in sorted(tiers):
+            _round_robin(tiers[tier], supply)
+    else:
+        _round_robin(states, supply)
+
+    plans = [state.plan for state in states if state.plan.gifts]
+    logger.info(
+        f"План покупок ({policy.value}): {len(plans)} из {len(candidates)} пользователей, "
+        f"{sum(len(plan.gifts) for plan in plans)} подарков, остаток саплая {supply}"
+    )
+    return plans
@@ -0,0 +1,214 @@
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Dict, Any, Optional, Tuple
+
+from loguru import logger
+
+
+class CatalogEventType(str, Enum):
+    """Типы изменений каталога подарков"""
+    NEW_GIFT = "new_gift"
+    SUPPLY_CHANGED = "supply_changed"
+    SOLD_OUT = "sold_out"
+    REMOVED = "removed"
+
+
+@dataclass(frozen=True)
+class CatalogEvent:
+    """Событие изменения каталога подарков"""
+    type: CatalogEventType
+    gift: Dict[str, Any]
+    previous: Optional[Dict[str, Any]] = None
+    drop_id: Optional[str] = None  # ID дропа для трассировки и журнала покупок
+
+
+def gift_fingerprint(gift: Dict[str, Any]) -> Tuple:
+    """Отпечаток содержимого подарка для быстрого сравнения"""
+    return (
+        gift["price"],
+        gift["upgrade_price"],
+        gift["total_count"],
+        gift["remaining_count"],
+    )
+
+
+class CatalogSnapshot:
+    """Последний известный каталог подарков и поиск отличий от него"""
+
+    def __init__(self):
+        self._gifts: Dict[str, Dict[str, Any]] = {}
+        self._fingerprints: Dict[str, Tuple] = {}
+        self._observed_at: Optional[float] = None
+        self.digest: Optional[bytes] = None  # Хэш последнего примененного сырого ответа (быстрый разбор)
+
+    def __len__(self) -> int:
+        return len(self._gifts)
+
+    def __contains__(self, gift_id: str) -> bool:
+        return gift_id in self._gifts
+
+    def get(self, gift_id: str) -> Optional[Dict[str, Any]]:
+        """Получить последнее известное состояние подарка"""
+        return self._gifts.get(gift_id)
+
+    def apply(
+        self,
+        gifts: List[Dict[str, Any]],
+        observed_at: Optional[float] = None,
+        drop_id: Optional[str] = None,
+        digest: Optional[bytes] = None
+    ) -> List[CatalogEvent]:
+        """Сравнить ответ get_available_gifts со снимком и обновить его
+
+        :param gifts: Список подарков из get_available_gifts
+        :param observed_at: Момент отправки запроса (time.monotonic), для нескольких опрашивающих ботов
+        :param drop_id: ID дропа, которым помечаются события
+        :param digest: Хэш сырого ответа, запоминается только если ответ применен
+        :return: Список событий изменения каталога
+        """
+        # Ответ на запрос, отправленный раньше уже примененного, устарел
+        if observed_at is not None:
+            if self._observed_at is not None and observed_at < self._observed_at:
+                logger.debug("Пропущен устаревший ответ каталога")
+                return []
+            self._observed_at = observed_at
+        if digest is not None:
+            self.digest = digest
+
+        events: List[CatalogEvent] = []
+        gifts_by_id = {gift["id"]: gift for gift in gifts}
+
+        for gift_id, gift in gifts_by_id.items():
+            fingerprint = gift_fingerprint(gift)
+            previous_fingerprint = self._fingerprints.get(gift_id)
+
+            # Содержимое не изменилось - ничего не делаем
+            if previous_fingerprint == fingerprint:
+                continue
+
+            previous = self._gifts.get(gift_id)
+            self._gifts[gift_id] = gift
+            self._fingerprints[gift_id] = fingerprint
+
+            if previous is None:
+                events.append(CatalogEvent(CatalogEventType.NEW_GIFT, gift, drop_id=drop_id))
+                continue
+
+            if gift["remaining_count"] == 0 and previous["remaining_count"] != 0:
+                events.append(CatalogEvent(CatalogEventType.SOLD_OUT, gift, previous, drop_id))
+            elif (
+                gift["remaining_count"] != previous["remaining_count"]
+                or gift["total_count"] != previous["total_count"]
+            ):
+                events.append(CatalogEvent(CatalogEventType.SUPPLY_CHANGED, gift, previous, drop_id))
+
+        for gift_id in list(self._gifts):
+            if gift_id not in gifts_by_id:
+                previous = self._gifts.pop(gift_id)
+                del self._fingerprints[gift_id]
+                events.append(CatalogEvent(CatalogEventType.REMOVED, previous, previous, drop_id))
+
+        for event in events:
+            if event.type == CatalogEventType.SUPPLY_CHANGED:
+                logger.debug(
+                    f"Изменился саплай подарка {event.gift['id']}: "
+                    f"{event.previous['remaining_count']} -> {event.gift['remaining_count']}"
+                )
+            else:
+                logger.info(f"Событие каталога {event.type.value}: подарок {event.gift['id']}")
+
+        return events
+
+
+@dataclass
+class HandledGift:
+    """Состояние подарка на момент последней рассылки"""
+    total_count: Optional[int]
+    remaining_count: Optional[int]
+    handled_at: float
+
+
+class HandledGifts:
+    """Учет уже разосланных подарков
+
+    Разосланный подарок подавляется, пока его не пополнят: не изменится
+    total_count или не вырастет remaining_count. Падение остатка (подарок
+    раскупают) рассылку не перезапускает. Пополнение раньше чем через
+    cooldown секунд после рассылки не теряется, а откладывается до конца
+    cooldown (см. due). Рассылку, сорвавшуюся из-за ошибки, можно отложить
+    через retry. Остальные подарки обрабатываются сразу.
+    """
+
+    def __init__(self, cooldown: float = 60.0):
+        self.cooldown = cooldown
+        self._handled: Dict[str, HandledGift] = {}
+        self._deferred: Dict[str, Tuple[float, Dict[str, Any]]] = {}  # Отложенные рассылки: (когда, последнее состояние подарка)
+
+    def __len__(self) -> int:
+        return len(self._handled)
+
+    def is_suppressed(self, gift: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """Подавлен ли подарок
+
+        Запоминает падение остатка и откладывает пополнения внутри cooldown.
+        """
+        handled = self._handled.get(gift["id"])
+        if handled is None:
+            return False
+        if gift["id"] in self._deferred:
+            # Рассылка уже отложена, держим для нее свежее состояние
+            self._deferred[gift["id"]] = (self._deferred[gift["id"]][0], gift)
+            return True
+
+        restocked = handled.total_count != gift["total_count"] or (
+            gift["remaining_count"] is not None
+            and handled.remaining_count is not None
+            and gift["remaining_count"] > handled.remaining_count
+        )
+        if not restocked:
+            # Пополнение считаем от последнего увиденного остатка
+            handled.remaining_count = gift["remaining_count"]
+            return True
+
+        now = time.monotonic() if now is None else now
+        if now - handled.handled_at < self.cooldown:
+            self._deferred[gift["id"]] = (handled.handled_at + self.cooldown, gift)
+            return True
+        return False
+
+    def next_due(self, now: Optional[float] = None) -> Optional[float]:
+        """Через сколько секунд подойдет ближайшая отложенная рассылка
+
+        :return: Секунды или None, если отложенных рассылок нет
+        """
+        if not self._deferred:
+            return None
+        now = time.monotonic() if now is None else now
+        expires = min(due_at for due_at, _ in self._deferred.values())
+        return max(0.0, expires - now)
+
+    def due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Забрать отложенные рассылки, время которых пришло"""
+        now = time.monotonic() if now is None else now
+        ready = [gift_id for gift_id, (due_at, _) in self._deferred.items() if due_at <= now]
+        return [self._deferred.pop(gift_id)[1] for gift_id in ready]
+
+    def retry(self, gift: Dict[str, Any], delay: float, now: Optional[float] = None) -> None:
+        """Повторить рассылку подарка через delay секунд, например после ошибки БД"""
+        now = time.monotonic() if now is None else now
+        self._deferred[gift["id"]] = (now + delay, gift)
+
+    def mark(self, gift: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Отметить подарок разосланным"""
+        self._handled[gift["id"]] = HandledGift(
+            total_count=gift["total_count"],
+            remaining_count=gift["remaining_count"],
+            handled_at=time.monotonic() if now is None else now
+        )
+        self._deferred.pop(gift["id"], None)
+
+    def forget(self, gift_id: str) -> None:
+        """Забыть подарок, например после распродажи"""
+        self._handled.pop(gift_id, None)
+        self._deferred.pop(gift_id, None)
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram import Bot
+from loguru import logger
+
+from app.services.catalog import CatalogSnapshot, CatalogEvent, gift_fingerprint
+from app.services.event_bus import EventBus
+from app.services.metrics import POLL_SECONDS, POLL_ERRORS, CATALOG_EVENTS
+from app.services.tracing import new_drop_id, record_span
+from app.services.poll_scheduler import PollScheduler
+
+# None - ответ не изменился с прошлого опроса
+FetchGifts = Callable[[Bot], Awaitable[Optional[List[Dict[str, Any]]]]]
+
+
+class CatalogPoller:
+    """Опрос каталога подарков одним ботом со сдвигом фазы"""
+
+    def __init__(self, pool: "CatalogPollerPool", poll_bot: Bot, scheduler: PollScheduler, phase: float = 0.0, name: str = ""):
+        self.pool = pool
+        self.bot = poll_bot
+        self.scheduler = scheduler
+        self.phase = phase  # Сдвиг на общей сетке опроса, доля интервала
+        self.name = name
+
+    async def poll_once(self) -> List[CatalogEvent]:
+        """Один опрос каталога с учетом задержки ответа планировщиком"""
+        started = time.monotonic()
+        started_at = time.time()
+        try:
+            gifts = await self.pool.fetch(self.bot)
+        except Exception as e:
+            self.scheduler.record_error(e)
+            POLL_ERRORS.inc(self.name)
+            raise
+        latency = time.monotonic() - started
+        POLL_SECONDS.observe(latency, self.name)
+
+        if gifts is None:
+            self.scheduler.record_success(latency, changed=False)
+            return []
+
+        # Пустой ответ не применяем, иначе все подарки станут "удаленными"
+        drop_id = new_drop_id()
+        events = self.pool.snapshot.apply(
+            gifts,
+            observed_at=started,
+            drop_id=drop_id,
+            digest=getattr(gifts, "digest", None)
+        ) if gifts else []
+        self.scheduler.record_success(latency, changed=bool(events))
+        if events:
+            # Опрос попадает в трассу только если что-то обнаружил
+            record_span(drop_id, "get_available_gifts", started_at, latency, bot=self.name, events=len(events))
+            self.pool.publish(events, source=self)
+        return events
+
+    async def run(self) -> None:
+        """Цикл опроса"""
+        # Первый опрос - в точке сетки со сдвигом этого бота
+        await asyncio.sleep(self.scheduler.grid_interval() * self.phase)
+        while self.pool.is_running:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"Ошибка опроса каталога ботом {self.name}: {e}")
+            await self.scheduler.wait()
+
+
+class CatalogPollerPool:
+    """Пул ботов, опрашивающих каталог с равномерно сдвинутыми фазами
+
+    При N ботах каталог опрашивается в среднем раз в interval / N секунд:
+    боты опрашивают по общей сетке со сдвигами 0, 1/N, ... (N-1)/N шага,
+    и в burst-режиме сдвиги сохраняются относительно burst-интервала.
+    Все боты применяют ответы к общему снимку каталога, поэтому событие
+    публикуется в шину только первым заметившим его ботом.
+    """
+
+    def __init__(
+        self,
+        bots: List[Bot],
+        fetch: FetchGifts,
+        snapshot: CatalogSnapshot,
+        event_bus: EventBus,
+        scheduler_factory: Callable[[], PollScheduler]
+    ):
+        self.fetch = fetch
+        self.snapshot = snapshot
+        self.event_bus = event_bus
+        self.is_running = False
+        self._tasks: List[asyncio.Task] = []
+
+        self.pollers: List[CatalogPoller] = []
+        for index, poll_bot in enumerate(bots):
+            scheduler = scheduler_factory()
+            self.pollers.append(CatalogPoller(
+                self,
+                poll_bot,
+                scheduler,
+                phase=index / len(bots),
+                name=f"#{index}"
+            ))
+
+    def publish(self, events: List[CatalogEvent], source: Optional[CatalogPoller] = None) -> None:
+        """Опубликовать события каталога и ускорить опрос остальных ботов"""
+        for event in events:
+            key = (event.type, event.gift["id"], gift_fingerprint(event.gift))
+            if self.event_bus.publish(event, key=key):
+                CATALOG_EVENTS.inc(event.type.value)
+
+        for poller in self.pollers:
+            if poller is not source:
+                poller.scheduler.trigger_burst()
+
+    def start(self) -> None:
+        """Запустить опрос всеми ботами"""
+        self.is_running = True
+        anchor = time.monotonic()
+        for poller in self.pollers:
+            poller.scheduler.align(anchor, poller.phase)
+        self._tasks = [asyncio.create_task(poller.run()) for poller in self.pollers]
+        logger.info(f"Запущен опрос каталога {len(self.pollers)} ботами")
+
+    def stop(self) -> None:
+        """Остановить опрос"""
+        self.is_running = False
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
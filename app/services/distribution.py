@@ -0,0 +1,154 @@
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from app.services.metrics import ROUND_SECONDS, USER_SECONDS
+from app.services.tracing import span
+
+# Задача пользователя: обработка покупок, возвращает потраченную сумму
+UserJob = Callable[[int], Awaitable[int]]
+
+
+@dataclass
+class UserRoundResult:
+    """Результат обработки одного пользователя в раунде рассылки"""
+    user_id: int
+    spent: int
+    duration: float
+    error: Optional[str] = None
+
+
+@dataclass
+class DistributionReport:
+    """Отчет о раунде рассылки"""
+    round_id: str
+    users: int = 0
+    duration: float = 0.0
+    results: List[UserRoundResult] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def total_spent(self) -> int:
+        return sum(result.spent for result in self.results)
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for result in self.results if result.error is not None)
+
+    @property
+    def done(self) -> bool:
+        return len(self.results) >= self.users
+
+
+class DistributionEngine:
+    """Постоянный пул воркеров, обрабатывающих покупки пользователей
+
+    Каждый пользователь в каждый момент обрабатывается не более чем одним
+    воркером, поэтому подарки и списания одного пользователя идут строго по
+    порядку. Пользователь, запрошенный во время обработки, ставится в
+    очередь повторно после ее завершения.
+    """
+
+    def __init__(self, concurrency: int = 10):
+        if concurrency <= 0:
+            raise ValueError("Concurrency must be positive")
+        self.concurrency = concurrency
+
+        self._job: Optional[UserJob] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._waiting: Dict[int, List[str]] = {}  # Пользователь -> раунды, ждущие его обработки
+        self._in_flight: Set[int] = set()
+        self._reports: Dict[str, DistributionReport] = {}
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def busy(self) -> bool:
+        """Есть ли пользователи в очереди или в работе"""
+        return bool(self._waiting or self._in_flight)
+
+    def start(self, job: UserJob) -> None:
+        """Запустить воркеры
+
+        :param job: Обработка покупок пользователя
+        """
+        self._job = job
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def stop(self) -> None:
+        """Остановить воркеры"""
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    def submit(self, user_ids: Iterable[int], round_id: Optional[str] = None) -> str:
+        """Поставить пользователей раунда в очередь
+
+        Пользователи, добавленные в незавершенный раунд (например, при
+        перераспределении саплая), учитываются в его отчете.
+
+        :param user_ids: ID пользователей
+        :param round_id: ID раунда рассылки
+        :return: ID раунда
+        """
+        round_id = round_id or uuid.uuid4().hex[:12]
+        user_ids = set(user_ids)
+        if not user_ids:
+            return round_id
+
+        report = self._reports.get(round_id)
+        if report is None:
+            self._reports[round_id] = DistributionReport(round_id=round_id, users=len(user_ids))
+        else:
+            report.users += len(user_ids)
+        for user_id in user_ids:
+            if user_id in self._waiting:
+                self._waiting[user_id].append(round_id)
+                continue
+            self._waiting[user_id] = [round_id]
+            if user_id not in self._in_flight:
+                self._queue.put_nowait(user_id)
+        return round_id
+
+    def _record(self, round_id: str, result: UserRoundResult) -> None:
+        report = self._reports.get(round_id)
+        if report is None:
+            return
+        report.results.append(result)
+        logger.debug(f"Раунд {round_id}: пользователь {result.user_id} обработан за {result.duration:.3f} сек")
+        if report.done:
+            del self._reports[round_id]
+            report.duration = time.perf_counter() - report.started
+            ROUND_SECONDS.observe(report.duration)
+            logger.info(
+                f"Раунд {round_id}: {report.users} пользователей за {report.duration:.3f} сек, "
+                f"потрачено {report.total_spent} звезд, ошибок {report.failed}"
+            )
+
+    async def _worker(self) -> None:
+        while True:
+            user_id = await self._queue.get()
+            rounds = self._waiting.pop(user_id, [])
+            self._in_flight.add(user_id)
+
+            started = time.perf_counter()
+            try:
+                with span("process_user", trace_id=rounds[0] if rounds else None, user_id=user_id):
+                    spent = await self._job(user_id)
+                result = UserRoundResult(user_id, spent or 0, time.perf_counter() - started)
+            except Exception as e:
+                result = UserRoundResult(user_id, 0, time.perf_counter() - started, str(e))
+                logger.error(f"Ошибка обработки покупок пользователя {user_id}: {e}")
+            finally:
+                self._in_flight.discard(user_id)
+            USER_SECONDS.observe(result.duration)
+
+            for round_id in rounds:
+                self._record(round_id, result)
+
+            # Пользователя запросили снова, пока он был в работе
+            if user_id in self._waiting:
+                self._queue.put_nowait(user_id)
@@ -1,26 +1,155 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from loguru import logger
 from functools import wraps
-from typing import Callable, Any
+from typing import Callable, Any, List, Optional, Tuple
 import traceback
 
+from app.config import settings
 from app.loader import bot
+from app.services.rate_limiter import Priority, api_priority
 
 ADMIN_ID = 487961820
 
+# Лимит длины сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+
+@dataclass
+class ErrorRecord:
+    """Однотипные ошибки за окно агрегации"""
+    error_type: str
+    context: str
+    site: str
+    message: str
+    traceback: str
+    count: int = 1
+    first_seen: float = 0.0
+    last_seen: float = 0.0
+
+
+def _error_site(error: BaseException) -> str:
+    """Место возникновения ошибки: файл и строка самого глубокого кадра"""
+    tb = error.__traceback__
+    if tb is None:
+        return "unknown"
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    return f"{tb.tb_frame.f_code.co_filename.rsplit('/', 1)[-1]}:{tb.tb_lineno}"
+
+
+class ErrorReporter:
+    """Очередь уведомлений об ошибках для администратора
+
+    report не блокирует вызывающий код: ошибки группируются по типу и месту
+    возникновения, а сводка уходит администратору не чаще раза в interval
+    секунд с приоритетом ERROR_REPORT.
+    """
+
+    def __init__(self, admin_id: int, interval: float = 60.0, max_records: int = 20):
+        self.admin_id = admin_id
+        self.interval = interval
+        self.max_records = max_records
+        self._records: "OrderedDict[Tuple[str, str, str], ErrorRecord]" = OrderedDict()
+        self._dropped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def report(self, error: BaseException, context: str = "") -> None:
+        """Учесть ошибку в ближайшей сводке"""
+        # Ошибка, проброшенная через несколько handle_errors, учитывается один раз
+        if getattr(error, "_error_reported", False):
+            return
+        try:
+            error._error_reported = True
+        except AttributeError:
+            pass
+
+        now = time.time()
+        site = _error_site(error)
+        key = (type(error).__name__, context, site)
+        record = self._records.get(key)
+        if record is not None:
+            record.count += 1
+            record.last_seen = now
+        elif len(self._records) >= self.max_records:
+            self._dropped += 1
+        else:
+            # Трейсбек форматируем только для первой ошибки группы
+            self._records[key] = ErrorRecord(
+                error_type=type(error).__name__,
+                context=context,
+                site=site,
+                message=str(error),
+                traceback="".join(traceback.format_exception(error)[-6:]),
+                first_seen=now,
+                last_seen=now
+            )
+        self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._run())
+            except RuntimeError:
+                # Нет цикла событий - сводка уйдет при следующей ошибке внутри цикла
+                pass
+
+    def _build_digest(self) -> List[str]:
+        records, self._records = list(self._records.values()), OrderedDict()
+        dropped, self._dropped = self._dropped, 0
+
+        total = sum(record.count for record in records) + dropped
+        header = f"🚨 Ошибки в боте: {total} за последние {self.interval:.0f} сек\n"
+        chunks = []
+        for record in records:
+            chunks.append(
+                f"\n{record.count}× {record.error_type} — {record.context}\n"
+                f"Место: {record.site}\n"
+                f"Сообщение: {record.message[:300]}\n"
+                f"Трейсбек:\n{record.traceback[-1200:]}"
+            )
+        if dropped:
+            chunks.append(f"\nИ еще {dropped} ошибок других типов")
+
+        messages, current = [], header
+        for chunk in chunks:
+            if len(current) + len(chunk) > MESSAGE_LIMIT:
+                messages.append(current)
+                current = chunk[:MESSAGE_LIMIT]
+            else:
+                current += chunk
+        messages.append(current)
+        return messages
+
+    async def flush(self) -> None:
+        """Отправить накопленную сводку"""
+        if not self._records and not self._dropped:
+            return
+        for message in self._build_digest():
+            try:
+                # Отчеты об ошибках не должны отнимать лимиты у покупок
+                with api_priority(Priority.ERROR_REPORT):
+                    await bot.send_message(self.admin_id, message, parse_mode=None)
+            except Exception as e:
+                logger.error(f"Не удалось отправить сводку ошибок: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await self.flush()
+            await asyncio.sleep(self.interval)
+            if not self._records and not self._dropped:
+                # Ошибок не было - засыпаем до следующей, первая уйдет сразу
+                return
+
+
+error_reporter = ErrorReporter(ADMIN_ID, settings.ERROR_DIGEST_INTERVAL, settings.ERROR_DIGEST_MAX_RECORDS)
+
+
 async def send_error_notification(error: Exception, context: str = "") -> None:
-    """Отправляет уведомление об ошибке администратору"""
-    try:
-        error_message = (
-            f"🚨 Ошибка в боте!\n\n"
-            f"Контекст: {context}\n"
-            f"Тип ошибки: {type(error).__name__}\n"
-            f"Сообщение: {str(error)}\n\n"
-            f"Трейсбек:\n{traceback.format_exc()}"
-        )
-        await bot.send_message(ADMIN_ID, error_message)
-        logger.error(f"Отправлено уведомление об ошибке: {error}")
-    except Exception as e:
-        logger.error(f"Не удалось отправить уведомление об ошибке: {e}")
+    """Отправляет уведомление об ошибке администратору через очередь сводок"""
+    error_reporter.report(error, context)
 
 def handle_errors(context: str = "") -> Callable:
     """Декоратор для обработки ошибок в асинхронных функциях"""
@@ -31,7 +160,7 @@ def handle_errors(context: str = "") -> Callable:
                 return await func(*args, **kwargs)
             except Exception as e:
                 logger.error(f"Ошибка в {func.__name__}: {e}")
-                await send_error_notification(e, f"{context} ({func.__name__})")
+                error_reporter.report(e, f"{context} ({func.__name__})")
                 raise
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
@@ -0,0 +1,44 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+
+class EventBus:
+    """Внутрипроцессная шина событий с отсечением повторов"""
+
+    def __init__(self, dedup_size: int = 1024):
+        self._subscribers: List[asyncio.Queue] = []
+        self._seen: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._dedup_size = dedup_size
+
+    def subscribe(self) -> asyncio.Queue:
+        """Подписаться на события
+
+        :return: Очередь, в которую будут приходить события
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """Отписаться от событий"""
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def publish(self, event: Any, key: Optional[Hashable] = None) -> bool:
+        """Опубликовать событие всем подписчикам
+
+        :param event: Событие
+        :param key: Ключ для отсечения повторов (None - без проверки)
+        :return: False, если событие с таким ключом уже публиковалось
+        """
+        if key is not None:
+            if key in self._seen:
+                return False
+            self._seen[key] = None
+            if len(self._seen) > self._dedup_size:
+                self._seen.popitem(last=False)
+
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+        return True
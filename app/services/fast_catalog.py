@@ -0,0 +1,67 @@
+import hashlib
+import json
+from typing import Any, ClassVar, Dict, List, Optional
+
+from aiogram.methods import GetAvailableGifts
+
+from app.services.catalog import CatalogSnapshot
+
+
+class RawGetAvailableGifts(GetAvailableGifts):
+    """getAvailableGifts, возвращающий тело ответа без разбора в модели aiogram
+
+    Наследуется от GetAvailableGifts, поэтому лимиты и метрики считают его
+    тем же методом. Сырой ответ отдает TunedAiohttpSession.
+    """
+
+    __raw_result__: ClassVar[bool] = True
+
+
+class ParsedCatalog(list):
+    """Подарки из сырого ответа вместе с его хэшем"""
+
+    def __init__(self, gifts: List[Dict[str, Any]], digest: bytes):
+        super().__init__(gifts)
+        self.digest = digest
+
+
+class FastCatalogParser:
+    """Разбор сырого ответа getAvailableGifts с пропуском неизменившихся ответов
+
+    Ответ сравнивается с хэшем последнего ответа, который принял снимок
+    каталога (CatalogSnapshot.digest). Хэш запоминает сам снимок, поэтому
+    отброшенный как устаревший ответ не считается увиденным, а ответ,
+    который уже применил любой бот, повторно не разбирается.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+
+    def parse(self, content: str) -> Optional[ParsedCatalog]:
+        """Извлечь из ответа только поля, нужные каталогу
+
+        :return: Подарки с хэшем ответа или None, если ответ уже применен
+        :raises ValueError: Если ответ не похож на успешный ответ getAvailableGifts
+        """
+        digest = hashlib.blake2b(content.encode(), digest_size=16).digest()
+        if digest == self.snapshot.digest:
+            return None
+
+        data = json.loads(content)
+        if not data.get("ok"):
+            raise ValueError(f"Unexpected getAvailableGifts response: {content[:200]}")
+        gifts = [
+            {
+                "id": gift["id"],
+                "price": gift["star_count"],
+                "upgrade_price": gift.get("upgrade_star_count"),
+                "total_count": gift.get("total_count"),
+                "remaining_count": gift.get("remaining_count")
+            }
+            for gift in data["result"]["gifts"]
+        ]
+        return ParsedCatalog(gifts, digest)
+
+    def reset(self) -> None:
+        """Забыть последний ответ, следующий будет разобран полностью"""
+        self.snapshot.digest = None
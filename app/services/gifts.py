@@ -1,22 +1,79 @@
 import asyncio
-from typing import List, Dict, Any
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Iterable, Set, Tuple
+from aiogram import Bot
 from loguru import logger
 
-from app.loader import bot
-from app.database.crud.gift_sql import get_active_purchase_settings
-from app.database.crud.user import decrease_user_balance
-from app.services.error_handler import handle_errors
+from app.config import settings
+from app.loader import bot, create_bot
+from app.database.cache import purchase_cache
+from app.database.crud.outbox import (
+    enqueue_purchases,
+    claim_pending_purchases,
+    complete_purchase,
+    fail_purchase,
+    interrupt_purchase,
+    cancel_pending_purchases,
+    resume_pending_purchases
+)
+from app.services.error_handler import handle_errors, error_reporter
+from app.services.catalog import CatalogSnapshot, CatalogEventType, HandledGifts
+from app.services.catalog_poller import CatalogPollerPool
+from app.services.fast_catalog import FastCatalogParser, RawGetAvailableGifts
+from app.services.distribution import DistributionEngine
+from app.services.allocation import AllocationPolicy, Candidate, allocate_purchases
+from app.services.event_bus import EventBus
+from app.services.metrics import GIFTS_SENT, GIFT_SEND_RETRIES
+from app.services.notifications import create_notification_aggregator
+from app.services.tracing import new_drop_id, setup_tracing, span
+from app.services.poll_scheduler import PollScheduler, create_poll_scheduler
+from app.services.retry_policy import SendOutcome, SendResult, create_retry_policy
 
 
 class GiftService:
-    def __init__(self):
+    def __init__(
+        self,
+        bots: Optional[List[Bot]] = None,
+        scheduler_factory: Callable[[], PollScheduler] = create_poll_scheduler
+    ):
         self.is_running = False
         self.is_distributing = False  # Флаг для отслеживания состояния рассылки
+        self.catalog = CatalogSnapshot()  # Последний известный каталог подарков
+        self.handled = HandledGifts(settings.GIFT_COOLDOWN_SECONDS)  # Уже разосланные подарки
+        self.event_bus = EventBus()  # Шина событий каталога
+        self.distribution = DistributionEngine(settings.DISTRIBUTION_CONCURRENCY)  # Воркеры отправки из outbox
+        self.notifications = create_notification_aggregator()  # Сводные уведомления пользователей
+        self.retry_policy = create_retry_policy()
+        self._round_users: "OrderedDict[str, Set[int]]" = OrderedDict()  # Участники последних раундов
+        self.allocation_policy = AllocationPolicy(settings.ALLOCATION_POLICY)
+        self.priority_tiers = [int(tier) for tier in settings.ALLOCATION_PRIORITY_TIERS.split(",") if tier.strip()]
+        self.fast_parser = FastCatalogParser(self.catalog) if settings.FAST_CATALOG_PARSER else None
+
+        # Основной бот плюс дополнительные токены для опроса каталога
+        if bots is None:
+            tokens = [token.strip() for token in settings.POLL_BOT_TOKENS.split(",") if token.strip()]
+            bots = [bot] + [create_bot(token) for token in tokens]
+        self.pollers = CatalogPollerPool(
+            bots,
+            self.get_available_gifts,
+            self.catalog,
+            self.event_bus,
+            scheduler_factory
+        )
 
     @handle_errors("Получение доступных подарков")
-    async def get_available_gifts(self) -> List[Dict[str, Any]]:
-        """Получить список доступных подарков через Telegram API"""
-        result = await bot.get_available_gifts()
+    async def get_available_gifts(self, poll_bot: Optional[Bot] = None) -> Optional[List[Dict[str, Any]]]:
+        """Получить список доступных подарков через Telegram API
+
+        :return: Подарки или None, если с быстрым разбором ответ не изменился
+        """
+        if self.fast_parser is not None:
+            content = await (poll_bot or bot)(RawGetAvailableGifts())
+            return self.fast_parser.parse(content)
+
+        result = await (poll_bot or bot).get_available_gifts()
         if result and result.gifts:
             gifts = [
                 {
@@ -36,14 +93,9 @@ class GiftService:
     async def process_unique_gifts(self, gifts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Обработка уникальных подарков"""
         # Закомментирована проверка на уникальность
+        # Подарки уже компактные словари из каталога, копировать их не нужно
         unique_gifts = [
-            {
-                "id": gift["id"],
-                "price": gift["price"],
-                "upgrade_price": gift["upgrade_price"],
-                "total_count": gift["total_count"],
-                "remaining_count": gift["remaining_count"]
-            }
+            gift
             for gift in gifts 
             if gift.get("total_count") is not None and gift["total_count"] > 0
         ]
@@ -54,174 +106,294 @@ class GiftService:
         return []
 
     @handle_errors("Рассылка подарков")
-    async def distribute_gifts(self, unique_gifts: List[Dict[str, Any]]) -> None:
-        """Рассылка уникальных подарков"""
+    async def distribute_gifts(self, unique_gifts: List[Dict[str, Any]], drop_id: Optional[str] = None) -> None:
+        """Рассылка уникальных подарков
+
+        :param unique_gifts: Подарки для рассылки
+        :param drop_id: ID дропа, он же ID раунда в outbox
+        """
         logger.info("Начинаем рассылку уникальных подарков")
         
-        # Получаем активные настройки автопокупки с балансом
-        users_with_settings = await get_active_purchase_settings()
+        # Активные настройки и балансы берем из кэша, без обращения к БД
+        with span("settings_load", cached=purchase_cache.loaded):
+            if not purchase_cache.loaded:
+                await purchase_cache.load()
         
-        if not users_with_settings:
+        if not len(purchase_cache):
             logger.info("Нет активных пользователей для автопокупки")
             return
             
-        # Флаг для отслеживания успешных отправок
-        gifts_sent = False
-        
-        # Обрабатываем каждого пользователя
-        for settings, balance in users_with_settings:
-            logger.info(f"Обрабатываем пользователя {settings.user_id} с балансом {balance}")
-            
-            # Фильтруем подарки по настройкам пользователя
-            suitable_gifts = self._filter_gifts_for_user(unique_gifts, settings)
-            
-            if not suitable_gifts:
-                logger.info(f"Для пользователя {settings.user_id} нет подходящих подарков")
+        # Находим подписчиков каждого подарка по индексу
+        with span("filter_users") as current:
+            candidates = self._find_candidates(unique_gifts)
+            if current:
+                current.set(candidates=len(candidates), users=len(purchase_cache))
+        logger.info(f"Подходящие подарки нашлись у {len(candidates)} из {len(purchase_cache)} пользователей")
+
+        # Распределяем оставшийся саплай между пользователями
+        with span("allocate", policy=self.allocation_policy.value):
+            plans = allocate_purchases(
+                unique_gifts,
+                candidates,
+                policy=self.allocation_policy,
+                priority_tiers=self.priority_tiers
+            )
+
+        # Резервируем звезды и пишем покупки в outbox, отправкой займутся воркеры
+        round_id = drop_id or new_drop_id()
+        with span("reserve_balances", plans=len(plans)):
+            reserved = await enqueue_purchases(
+                [(plan.candidate.user_id, plan.gifts) for plan in plans],
+                round_id
+            )
+        if reserved is None:
+            # Ошибка БД: подарки не отмечаем разосланными и повторяем рассылку через интервал опроса
+            logger.error(f"Раунд {round_id}: не удалось записать покупки, повтор через {settings.POLL_INTERVAL} сек")
+            for gift in unique_gifts:
+                self.handled.retry(gift, settings.POLL_INTERVAL)
+            return
+        self._track_round(round_id, reserved)
+        self.distribution.submit(reserved, round_id)
+        for gift in unique_gifts:
+            self.handled.mark(gift)
+
+        # Уведомляем тех, кому не хватило средств (а не саплая)
+        planned_users = {plan.candidate.user_id for plan in plans}
+        for candidate in candidates:
+            if candidate.user_id in reserved:
                 continue
-                
-            # Рассчитываем и покупаем подарки
-            total_spent = await self._purchase_gifts_for_user(settings, suitable_gifts, balance)
-            
-            if total_spent > 0:
-                await bot.send_message(settings.user_id, f"Подарки успешно куплены на сумму {total_spent} звезд")
-                logger.info(f"Пользователь {settings.user_id} потратил {total_spent} звезд")
-                gifts_sent = True  # Отмечаем, что подарки были отправлены
+            if candidate.user_id in planned_users or \
+                    candidate.balance < min(gift["price"] for gift in candidate.gifts):
+                self.notifications.insufficient_funds(candidate.user_id)
+                logger.info(f"Пользователь {candidate.user_id} не смог купить подарки")
             else:
-                await bot.send_message(settings.user_id, f"Недостаточно средств для покупки подарков")
-                logger.info(f"Пользователь {settings.user_id} не смог купить подарки")
-        
-        # Пауза только если были отправлены подарки
-        if gifts_sent:
-            await asyncio.sleep(60)
-            logger.info("Рассылка завершена, пауза 60 секунд")
-        else:
-            logger.info("Подарки не были отправлены, пауза не нужна")
+                logger.info(f"Пользователю {candidate.user_id} не хватило саплая")
 
-    @handle_errors("Фильтрация подарков")
-    def _filter_gifts_for_user(self, gifts: List[Dict[str, Any]], settings) -> List[Dict[str, Any]]:
-        """Фильтрует подарки по настройкам пользователя"""
-        suitable_gifts = []
-        
+        logger.info(f"Раунд {round_id}: покупки запланированы для {len(reserved)} пользователей")
+
+    def _find_candidates(self, gifts: List[Dict[str, Any]], exclude: Iterable[int] = ()) -> List[Candidate]:
+        """Подписчики подарков с балансами из кэша в порядке БД"""
+        exclude = set(exclude)
+        suitable_gifts: Dict[int, List[Dict[str, Any]]] = {}
         for gift in gifts:
-            price = gift["price"]
-            total_count = gift["total_count"]
-            
-            # Проверяем минимальную цену (0 = без ограничений)
-            if settings.min_price > 0 and price < settings.min_price:
-                continue
-                
-            # Проверяем максимальную цену (0 = без ограничений)
-            if settings.max_price > 0 and price > settings.max_price:
-                continue
-                
-            # Проверяем лимит саплая (0 = без ограничений)
-            if settings.supply_limit > 0 and total_count > settings.supply_limit:
-                continue
-                
-            suitable_gifts.append(gift)
-            
-        logger.info(f"Для пользователя {settings.user_id} подходят подарки: {[g['id'] for g in suitable_gifts]}")
-        return suitable_gifts
+            for user_id in purchase_cache.index.match(gift["price"], gift["total_count"]):
+                if user_id not in exclude:
+                    suitable_gifts.setdefault(user_id, []).append(gift)
 
-    @handle_errors("Покупка подарков")
-    async def _purchase_gifts_for_user(self, settings, gifts: List[Dict[str, Any]], balance: int) -> int:
-        """Покупает подарки для пользователя и возвращает потраченную сумму"""
-        if not gifts:
-            return 0
-            
-        # Рассчитываем общую стоимость всех подарков за один цикл
-        cycle_cost = sum(gift["price"] for gift in gifts)
-        
-        # Проверяем, хватает ли денег хотя бы на один цикл
-        if balance < cycle_cost:
-            # Проверяем, можем ли купить хотя бы один самый дешевый подарок
-            min_price = min(gift["price"] for gift in gifts)
-            if balance < min_price:
-                logger.info(f"У пользователя {settings.user_id} недостаточно средств даже на самый дешевый подарок")
-                return 0
+        # Кандидаты в порядке БД, чтобы first_come работал как раньше
+        candidates = []
+        for user_id, user_gifts in suitable_gifts.items():
+            entry = purchase_cache.get(user_id)
+            if entry is not None:
+                candidates.append(Candidate(entry, entry.balance, user_gifts))
+        candidates.sort(key=lambda candidate: candidate.settings.id)
+        return candidates
+
+    def _track_round(self, round_id: str, user_ids: Iterable[int]) -> None:
+        """Запомнить участников раунда для перераспределения саплая"""
+        self._round_users.setdefault(round_id, set()).update(user_ids)
+        self._round_users.move_to_end(round_id)
+        while len(self._round_users) > 32:
+            self._round_users.popitem(last=False)
+
+    async def _reallocate(self, round_id: str, gift_id: str, units: int) -> None:
+        """Отдать саплай, освобожденный неудачными покупками, не участвовавшим в раунде"""
+        gift = self.catalog.get(gift_id)
+        if gift is None or gift["remaining_count"] == 0:
+            return
+        remaining = units if gift["remaining_count"] is None else min(units, gift["remaining_count"])
+        spare = {**gift, "remaining_count": remaining}
+
+        candidates = self._find_candidates([spare], exclude=self._round_users.get(round_id, ()))
+        plans = allocate_purchases([spare], candidates, policy=self.allocation_policy, priority_tiers=self.priority_tiers)
+        if not plans:
+            return
+        reserved = await enqueue_purchases([(plan.candidate.user_id, plan.gifts) for plan in plans], round_id) or {}
+        self._track_round(round_id, reserved)
+        self.distribution.submit(reserved, round_id)
+        logger.info(f"Раунд {round_id}: {units} шт. подарка {gift_id} перераспределены на {len(reserved)} пользователей")
+
+    async def _process_user(self, user_id: int) -> int:
+        """Покупает подарки из outbox пользователя, уведомление уходит сводкой"""
+        total_spent = await self._purchase_gifts_for_user(user_id)
         
+        if total_spent > 0:
+            logger.info(f"Пользователь {user_id} потратил {total_spent} звезд")
+        return total_spent
+
+    @handle_errors("Покупка подарков")
+    async def _purchase_gifts_for_user(self, user_id: int) -> int:
+        """Отправляет ожидающие покупки пользователя и возвращает потраченную сумму"""
+        with span("claim_purchases"):
+            purchases = await claim_pending_purchases(user_id) or []
+        logger.info(f"Обрабатываем пользователя {user_id}: в outbox {len(purchases)} подарков")
+
         total_spent = 0
-        gifts_to_send = []  # Список подарков для отправки
-        
-        # Проходим циклы покупки
-        for cycle in range(settings.purchase_cycles):
-            cycle_gifts = []
-            cycle_spent = 0
-            
-            # Пытаемся купить каждый подарок в текущем цикле
-            for gift in gifts:
-                gift_price = gift["price"]
-                
-                # Проверяем, хватает ли денег на этот подарок
-                if balance >= gift_price:
-                    cycle_gifts.append({
-                        "id": gift["id"],
-                        "price": gift_price,
-                        "user_id": settings.user_id
-                    })
-                    cycle_spent += gift_price
-                    balance -= gift_price
-                    
-            if cycle_gifts:
-                gifts_to_send.extend(cycle_gifts)
-                total_spent += cycle_spent
-                logger.info(f"Цикл {cycle + 1}: куплено {len(cycle_gifts)} подарков на {cycle_spent} звезд")
+        sold_out: Set[str] = set()
+        freed: Dict[Tuple[str, str], int] = {}  # (раунд, подарок) -> освободившийся саплай
+        for index, purchase in enumerate(purchases):
+            if purchase.gift_id in sold_out:
+                await fail_purchase(purchase.id, "Подарок закончился")
+                continue
+
+            # Дедлайн дропа отсчитывается от планирования покупки
+            deadline = time.monotonic() + settings.SEND_DEADLINE - (datetime.now() - purchase.created_at).total_seconds()
+            with span("send_gift", gift_id=purchase.gift_id, price=purchase.price) as current:
+                result = await self._send_gift(user_id, {"id": purchase.gift_id, "price": purchase.price}, deadline)
+                if current:
+                    current.set(outcome=result.outcome.value, attempts=result.attempts)
+
+            if result.ok:
+                with span("confirm_purchase"):
+                    await complete_purchase(purchase.id)
+                total_spent += purchase.price
+                self.notifications.purchased(user_id, purchase.gift_id, purchase.price)
+                continue
+
+            if result.outcome == SendOutcome.UNKNOWN:
+                # Запрос мог дойти до API: не повторяем и не возвращаем звезды, решает админ
+                await interrupt_purchase(purchase.id, f"{result.outcome.value}: {result.error}")
+                error_reporter.report(
+                    result.error,
+                    f"Исход отправки неизвестен, покупка #{purchase.id}: /purchase confirm|refund {purchase.id}"
+                )
             else:
-                logger.info(f"Цикл {cycle + 1}: недостаточно средств для покупки подарков")
-                break
-        
-        # Отправляем подарки пользователю
-        if gifts_to_send:
-            await self._send_gifts_to_user(settings.user_id, gifts_to_send)
-            
-            # Списываем потраченную сумму с баланса
-            if total_spent > 0:
-                await decrease_user_balance(settings.user_id, total_spent)
-                logger.info(f"Списано {total_spent} звезд с баланса пользователя {settings.user_id}")
-        
+                await fail_purchase(purchase.id, f"{result.outcome.value}: {result.error}")
+            if result.outcome == SendOutcome.SOLD_OUT:
+                # Остальные подарки пользователя покупаем, этот снимаем у всех
+                sold_out.add(purchase.gift_id)
+                await cancel_pending_purchases("Подарок закончился", gift_id=purchase.gift_id)
+                continue
+
+            # Прерываем покупку, звезды за неотправленные подарки возвращаются
+            logger.error(f"Покупка для пользователя {user_id} прервана: {result.outcome.value} {result.error}")
+            rest = purchases[index:]
+            with span("release_balance", purchases=len(rest)):
+                for failed in rest[1:]:
+                    await fail_purchase(failed.id, f"{result.outcome.value}: {result.error}")
+            if result.outcome == SendOutcome.BOT_BALANCE:
+                # Без звезд у бота не уйдет ни один подарок
+                error_reporter.report(result.error, "Баланс звезд бота")
+                await cancel_pending_purchases("Недостаточно звезд у бота")
+            elif result.outcome in (SendOutcome.BAD_RECIPIENT, SendOutcome.FAILED):
+                if result.outcome == SendOutcome.FAILED:
+                    error_reporter.report(result.error, "Отправка подарков (_send_gift)")
+                for failed in rest:
+                    key = (failed.round_id, failed.gift_id)
+                    freed[key] = freed.get(key, 0) + 1
+            break
+
+        for (round_id, gift_id), units in freed.items():
+            await self._reallocate(round_id, gift_id, units)
+
+        logger.info(f"Списано {total_spent} звезд с баланса пользователя {user_id}")
         return total_spent
 
-    @handle_errors("Отправка подарков")
-    async def _send_gifts_to_user(self, user_id: int, gifts: List[Dict[str, Any]]) -> None:
-        """Отправляет подарки пользователю через Telegram API"""
-        for gift in gifts:
-            max_attempts = 60 * 5
-            attempt = 0
-            
-            while attempt < max_attempts:
-                try:
-                    await bot.send_gift(gift["id"], user_id, text=f"@vityooook love u")
-                    logger.info(f"Отправлен подарок {gift['id']} пользователю {user_id} за {gift['price']} звезд")
-                    break  # Успешная отправка, выходим из цикла
-                except Exception as e:
-                    attempt += 1
-                    if attempt == max_attempts:
-                        logger.error(f"Не удалось отправить подарк {gift['id']} пользователю {user_id} после {max_attempts} попыток: {e}")
-                        raise  # Если все попытки исчерпаны, пробрасываем ошибку дальше
-                    else:
-                        logger.warning(f"Попытка {attempt} отправки подарка {gift['id']} не удалась. Повторная попытка через 1 секунду")
-                        await asyncio.sleep(1)  # Пауза 1 секунда между попытками
-                        continue
+    async def _send_gift(self, user_id: int, gift: Dict[str, Any], deadline: float) -> SendResult:
+        """Отправляет подарок пользователю через Telegram API с повторами по политике"""
+
+        async def attempt_send(attempt: int) -> None:
+            with span("send_gift_attempt", attempt=attempt):
+                await bot.send_gift(gift["id"], user_id, text=f"@vityooook love u")
+
+        def on_retry(attempt: int, error: BaseException, delay: float) -> None:
+            GIFT_SEND_RETRIES.inc()
+            logger.warning(f"Попытка {attempt} отправки подарка {gift['id']} не удалась: {error}. Повтор через {delay:.2f} сек")
+
+        result = await self.retry_policy.run(attempt_send, deadline, on_retry)
+        if result.ok:
+            GIFTS_SENT.inc()
+            logger.info(f"Отправлен подарок {gift['id']} пользователю {user_id} за {gift['price']} звезд")
+        else:
+            log = logger.warning if result.outcome == SendOutcome.SOLD_OUT else logger.error
+            log(
+                f"Не удалось отправить подарок {gift['id']} пользователю {user_id} "
+                f"после {result.attempts} попыток ({result.outcome.value}): {result.error}"
+            )
+        return result
 
     @handle_errors("Проверка и покупка подарков")
     async def check_and_purchase_gifts(self) -> None:
         """Проверка доступных подарков"""
         self.is_running = True
-        while self.is_running:
-            try:
-                if not self.is_distributing:
-                    available_gifts = await self.get_available_gifts()
-                    if available_gifts:
-                        unique_gifts = await self.process_unique_gifts(available_gifts)
+        if settings.TRACING_ENABLED:
+            setup_tracing()
+
+        # Загружаем кэш настроек автопокупки до начала опроса
+        await purchase_cache.load()
+        reconciler = asyncio.create_task(purchase_cache.run_reconciler(settings.CACHE_RECONCILE_INTERVAL))
+        self.notifications.watch_balances(purchase_cache)
+
+        # Запускаем воркеры и возобновляем ожидающие покупки; прерванные отправки решает админ
+        self.distribution.start(self._process_user)
+        user_ids, interrupted = await resume_pending_purchases() or ([], [])
+        self.distribution.submit(user_ids, "resume")
+        if interrupted:
+            error_reporter.report(
+                RuntimeError(
+                    f"{len(interrupted)} покупок прервано перезапуском, исход неизвестен: "
+                    + ", ".join(f"#{purchase.id} {purchase.gift_id} → {purchase.user_id}" for purchase in interrupted[:20])
+                    + ". Проверьте и решите: /purchase confirm <id> или /purchase refund <id>"
+                ),
+                "Прерванные покупки"
+            )
+
+        events = self.event_bus.subscribe()
+        self.pollers.start()
+        try:
+            while self.is_running:
+                # Забираем все накопившиеся события каталога разом, просыпаясь к концу cooldown отложенных пополнений
+                try:
+                    batch = [await asyncio.wait_for(events.get(), self.handled.next_due())]
+                except asyncio.TimeoutError:
+                    batch = []
+                while not events.empty():
+                    batch.append(events.get_nowait())
+
+                # Рассылку запускают новые подарки и изменения саплая уже разосланных
+                latest: Dict[str, Dict[str, Any]] = {}
+                drop_ids: Dict[str, Optional[str]] = {}
+                for event in batch:
+                    if event is None:
+                        continue
+                    if event.type in (CatalogEventType.SOLD_OUT, CatalogEventType.REMOVED):
+                        self.handled.forget(event.gift["id"])
+                        latest.pop(event.gift["id"], None)
+                    else:
+                        latest[event.gift["id"]] = event.gift
+                        drop_ids.setdefault(event.gift["id"], event.drop_id)
+                # Пополнения, отложенные до конца cooldown, идут со свежим состоянием подарка
+                ready = {gift["id"]: gift for gift in self.handled.due()}
+                for gift in latest.values():
+                    if gift["id"] in ready or not self.handled.is_suppressed(gift):
+                        ready[gift["id"]] = gift
+                new_gifts = list(ready.values())
+                if not new_gifts:
+                    continue
+                drop_id = drop_ids.get(new_gifts[0]["id"])
+
+                try:
+                    with span("drop", trace_id=drop_id, gifts=[gift["id"] for gift in new_gifts]):
+                        with span("process_unique_gifts"):
+                            unique_gifts = await self.process_unique_gifts(new_gifts)
                         if unique_gifts:
                             self.is_distributing = True
-                            await self.distribute_gifts(unique_gifts)
-                            self.is_distributing = False
-                await asyncio.sleep(1)
-            except Exception as e:
-                logger.error(f"Ошибка в check_and_purchase_gifts: {e}")
-                await asyncio.sleep(1)
+                            with span("distribute_gifts", gifts=len(unique_gifts)):
+                                await self.distribute_gifts(unique_gifts, drop_id)
+                except Exception as e:
+                    logger.error(f"Ошибка в check_and_purchase_gifts: {e}")
+                finally:
+                    self.is_distributing = False
+        finally:
+            self.pollers.stop()
+            self.distribution.stop()
+            reconciler.cancel()
+            self.event_bus.unsubscribe(events)
+            await self.notifications.stop()
 
     def stop(self):
         """Остановить сервис"""
         self.is_running = False
+        self.pollers.stop()
+        # Будим цикл обработки событий
+        self.event_bus.publish(None)
@@ -0,0 +1,106 @@
+import asyncio
+from http import HTTPStatus
+from typing import Any, Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import Response, TelegramMethod
+from aiohttp import ClientError, ClientSession
+from loguru import logger
+from yarl import URL
+
+
+def parse_method_timeouts(value: str) -> Dict[str, float]:
+    """Разобрать таймауты методов вида "sendGift:10,getAvailableGifts:5"
+
+    :raises ValueError: При некорректном формате
+    """
+    timeouts = {}
+    for chunk in value.split(","):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        try:
+            method, timeout = chunk.split(":")
+            timeouts[method.strip()] = float(timeout)
+        except ValueError:
+            raise ValueError(f"Invalid method timeout: {chunk}")
+    return timeouts
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """Сессия Bot API с пулом keep-alive соединений и прогревом
+
+    Фоновая задача держит открытыми warm_connections соединений, поэтому
+    первый запрос дропа не платит за DNS и TLS-рукопожатие.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 60.0,
+        method_timeouts: Optional[Dict[str, float]] = None,
+        warm_connections: int = 0,
+        warm_interval: float = 30.0,
+        **kwargs: Any
+    ):
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init.update(
+            limit_per_host=limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=dns_cache_ttl,
+            keepalive_timeout=keepalive_timeout,
+        )
+        self.method_timeouts = method_timeouts or {}
+        self.warm_connections = warm_connections
+        self.warm_interval = warm_interval
+        self._warmer: Optional[asyncio.Task] = None
+
+    async def create_session(self) -> ClientSession:
+        session = await super().create_session()
+        if self.warm_connections > 0 and (self._warmer is None or self._warmer.done()):
+            self._warmer = asyncio.create_task(self._warm_loop())
+        return session
+
+    async def close(self) -> None:
+        if self._warmer is not None:
+            self._warmer.cancel()
+            self._warmer = None
+        await super().close()
+
+    def check_response(self, bot: Bot, method: TelegramMethod, status_code: int, content: str) -> Response:
+        # Методы с __raw_result__ получают тело ответа как есть, ошибки разбираются штатно
+        if getattr(method, "__raw_result__", False) and status_code == HTTPStatus.OK:
+            return Response[Any].model_construct(ok=True, result=content)
+        return super().check_response(bot, method, status_code, content)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None):
+        if timeout is None:
+            timeout = self.method_timeouts.get(method.__api_method__)
+        return await super().make_request(bot, method, timeout=timeout)
+
+    async def warm(self) -> None:
+        """Открыть warm_connections соединений с сервером Bot API"""
+        session = await super().create_session()
+        origin = str(URL(self.api.api_url(token="0", method="getMe")).origin())
+
+        async def touch() -> None:
+            # Ответ на корень не важен, соединение остается в пуле
+            async with session.head(origin, allow_redirects=False, timeout=10) as response:
+                await response.read()
+
+        results = await asyncio.gather(*(touch() for _ in range(self.warm_connections)), return_exceptions=True)
+        failed = [result for result in results if isinstance(result, (ClientError, asyncio.TimeoutError))]
+        if failed:
+            logger.warning(f"Прогрев соединений с {origin}: {len(failed)} из {len(results)} не удались: {failed[0]}")
+
+    async def _warm_loop(self) -> None:
+        # Интервал меньше keepalive_timeout, чтобы соединения не закрывались простоем
+        while True:
+            try:
+                await self.warm()
+            except Exception as e:
+                logger.warning(f"Ошибка прогрева соединений Bot API: {e}")
+            await asyncio.sleep(self.warm_interval)
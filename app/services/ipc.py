@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from loguru import logger
+
+# Обработчик входящего сообщения IPC
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class IpcServer:
+    """Локальный канал приема сообщений через unix-сокет
+
+    Протокол - JSON-объекты, по одному на строку.
+    """
+
+    def __init__(self, path: str, handler: MessageHandler):
+        self.path = path
+        self.handler = handler
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        """Начать прием подключений"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        logger.info(f"IPC сервер слушает {self.path}")
+
+    async def stop(self) -> None:
+        """Закрыть сокет"""
+        for writer in list(self._connections):
+            writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(writer)
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Некорректное IPC сообщение: {e}")
+                    continue
+                try:
+                    await self.handler(message)
+                except Exception as e:
+                    logger.error(f"Ошибка обработки IPC сообщения {message.get('op')}: {e}")
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+
+class IpcClient:
+    """Отправка сообщений в IpcServer
+
+    Отправка не блокирует вызывающий код: сообщения копятся в очереди и
+    пишутся в сокет фоновой задачей, которая переподключается при обрыве.
+    Сообщения, потерянные при обрыве, исправит сверка кэша с БД.
+    """
+
+    def __init__(self, path: str, reconnect_delay: float = 1.0, max_queue: int = 10000):
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запустить фоновую отправку"""
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """Остановить фоновую отправку"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def send(self, message: Dict[str, Any]) -> None:
+        """Поставить сообщение в очередь на отправку"""
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning(f"Очередь IPC переполнена, сообщение {message.get('op')} отброшено")
+
+    async def _run(self) -> None:
+        message = None
+        while True:
+            try:
+                _, writer = await asyncio.open_unix_connection(self.path)
+            except OSError as e:
+                logger.debug(f"IPC сервер {self.path} недоступен: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            try:
+                while True:
+                    if message is None:
+                        message = await self._queue.get()
+                    writer.write(json.dumps(message).encode() + b"\n")
+                    await writer.drain()
+                    message = None
+            except OSError as e:
+                logger.warning(f"IPC соединение с {self.path} разорвано: {e}")
+            finally:
+                writer.close()
@@ -0,0 +1,221 @@
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiohttp import web
+from loguru import logger
+
+from app.config import settings
+
+# Границы гистограмм задержек, сек
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROUND_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Монотонный счетчик"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        """Увеличить счетчик для набора меток"""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: Any) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами
+
+    observe - один bisect и два сложения, накопительные значения
+    считаются только при выдаче метрик.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, List] = {}  # Метки -> [счетчики корзин, сумма]
+
+    def observe(self, value: float, *labels: Any) -> None:
+        """Учесть наблюдение для набора меток"""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: Any) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Набор метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Опрос каталога
+POLL_SECONDS = registry.histogram("gift_poll_seconds", "Latency of get_available_gifts polls", ["bot"])
+POLL_ERRORS = registry.counter("gift_poll_errors_total", "Failed get_available_gifts polls", ["bot"])
+CATALOG_EVENTS = registry.counter("gift_catalog_events_total", "Catalog change events", ["type"])
+
+# Рассылка
+ROUND_SECONDS = registry.histogram("gift_distribution_round_seconds", "Distribution round duration", buckets=ROUND_BUCKETS)
+USER_SECONDS = registry.histogram("gift_distribution_user_seconds", "Per-user purchase processing time", buckets=ROUND_BUCKETS)
+GIFTS_SENT = registry.counter("gift_sent_total", "Gifts sent")
+GIFT_SEND_RETRIES = registry.counter("gift_send_retries_total", "send_gift retries after an error")
+
+# Telegram API
+API_SECONDS = registry.histogram("telegram_api_seconds", "Telegram API call latency", ["method"])
+API_ERRORS = registry.counter("telegram_api_errors_total", "Telegram API errors", ["method", "error"])
+API_RETRY_AFTER = registry.counter("telegram_api_retry_after_total", "Requests retried after a 429 response", ["method"])
+
+# БД и хендлеры
+DB_SECONDS = registry.histogram("db_call_seconds", "Database time per CRUD function", ["function"])
+HANDLER_SECONDS = registry.histogram("handler_seconds", "Update handler latency", ["router", "handler"])
+
+
+def db_timed(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Декоратор CRUD-функций: время работы с БД по имени функции"""
+    if not settings.METRICS_ENABLED:
+        return func
+
+    label = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    @wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            DB_SECONDS.observe(time.perf_counter() - started, label)
+    return wrapper
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Задержки и ошибки запросов бота к Telegram API"""
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod):
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            API_ERRORS.inc(name, type(e).__name__)
+            raise
+        finally:
+            API_SECONDS.observe(time.perf_counter() - started, name)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Задержка хендлеров по модулю роутера из app/handlers"""
+
+    async def __call__(self, handler: Callable, event: Any, data: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            handler_object = data.get("handler")
+            callback = getattr(handler_object, "callback", None)
+            router = getattr(callback, "__module__", "unknown").rsplit(".", 1)[-1]
+            HANDLER_SECONDS.observe(time.perf_counter() - started, router, getattr(callback, "__name__", "unknown"))
+
+
+def instrument_router(router) -> None:
+    """Подключить замер хендлеров к роутеру и всем его дочерним роутерам"""
+    middleware = HandlerMetricsMiddleware()
+    for observer in (router.message, router.callback_query, router.pre_checkout_query):
+        observer.middleware(middleware)
+
+
+async def start_metrics_server(host: str, port: int) -> Optional[web.AppRunner]:
+    """Запустить HTTP эндпоинт /metrics"""
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
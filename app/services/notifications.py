@@ -0,0 +1,112 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from app.config import settings
+from app.database.cache import PurchaseSettingsCache
+from app.loader import bot
+from app.services.rate_limiter import Priority, api_priority
+
+
+@dataclass
+class UserDigest:
+    """Итоги покупок пользователя за окно агрегации"""
+    gifts: Dict[str, List[int]] = field(default_factory=dict)  # ID подарка -> [количество, звезды]
+    insufficient_funds: bool = False
+
+    @property
+    def spent(self) -> int:
+        return sum(stars for _, stars in self.gifts.values())
+
+    def render(self) -> str:
+        lines = []
+        if self.gifts:
+            lines.append(f"🎁 Подарки успешно куплены на сумму {self.spent} звезд:")
+            for gift_id, (count, stars) in self.gifts.items():
+                lines.append(f"• {gift_id} × {count} — {stars} ⭐")
+        if self.insufficient_funds:
+            if lines:
+                lines.append("")
+            lines.append("Недостаточно средств для покупки подарков")
+        return "\n".join(lines)
+
+
+class NotificationAggregator:
+    """Сводные уведомления пользователей о покупках
+
+    Итоги покупок копятся по пользователям и уходят одним сообщением за окно
+    interval секунд с приоритетом NOTIFICATION. Сообщение о нехватке средств
+    повторяется не чаще раза в funds_cooldown секунд и снова разрешается
+    после изменения баланса.
+    """
+
+    def __init__(self, interval: float = 5.0, funds_cooldown: float = 3600.0):
+        self.interval = interval
+        self.funds_cooldown = funds_cooldown
+        self._digests: Dict[int, UserDigest] = {}
+        self._funds_notified: Dict[int, float] = {}  # Пользователь -> время последнего уведомления
+        self._task: Optional[asyncio.Task] = None
+
+    def watch_balances(self, cache: PurchaseSettingsCache) -> None:
+        """Сбрасывать подавление уведомлений о нехватке средств при изменении баланса"""
+        def on_change(op: str, data: dict) -> None:
+            if op in ("balance", "settings"):
+                self._funds_notified.pop(data.get("user_id"), None)
+        cache.add_listener(on_change)
+
+    def purchased(self, user_id: int, gift_id: str, price: int) -> None:
+        """Учесть купленный подарок"""
+        digest = self._digests.setdefault(user_id, UserDigest())
+        totals = digest.gifts.setdefault(gift_id, [0, 0])
+        totals[0] += 1
+        totals[1] += price
+        # Покупка тратит баланс, о следующей нехватке стоит сообщить
+        self._funds_notified.pop(user_id, None)
+        self._ensure_started()
+
+    def insufficient_funds(self, user_id: int) -> None:
+        """Учесть нехватку средств, если о ней давно не сообщали"""
+        now = time.monotonic()
+        notified = self._funds_notified.get(user_id)
+        if notified is not None and now - notified < self.funds_cooldown:
+            return
+        self._funds_notified[user_id] = now
+        self._digests.setdefault(user_id, UserDigest()).insufficient_funds = True
+        self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def flush(self) -> None:
+        """Отправить накопленные сводки"""
+        digests, self._digests = self._digests, {}
+        for user_id, digest in digests.items():
+            try:
+                with api_priority(Priority.NOTIFICATION):
+                    await bot.send_message(user_id, digest.render(), parse_mode=None)
+            except Exception as e:
+                logger.error(f"Не удалось отправить уведомление пользователю {user_id}: {e}")
+
+    async def _run(self) -> None:
+        # Первое событие окна ждет остальные, затем окно закрывается
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+            if not self._digests:
+                return
+
+    async def stop(self) -> None:
+        """Отправить оставшиеся сводки и остановить агрегацию"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+def create_notification_aggregator() -> NotificationAggregator:
+    """Агрегатор уведомлений из настроек"""
+    return NotificationAggregator(settings.NOTIFY_DIGEST_INTERVAL, settings.NOTIFY_FUNDS_COOLDOWN)
@@ -0,0 +1,224 @@
+import asyncio
+import math
+import random
+import time
+from datetime import datetime, time as dt_time, timezone
+from typing import List, Optional, Tuple
+
+from aiohttp import ClientError
+from aiogram.exceptions import TelegramRetryAfter, TelegramNetworkError, TelegramServerError
+from loguru import logger
+
+from app.config import settings
+
+# Ошибки сети, после которых опрос замедляется
+NETWORK_ERRORS = (TelegramNetworkError, TelegramServerError, ClientError, asyncio.TimeoutError)
+
+
+def parse_drop_windows(value: str) -> List[Tuple[dt_time, dt_time]]:
+    """Разобрать окна дропов вида "HH:MM-HH:MM" через запятую (UTC)
+
+    :param value: Строка с окнами
+    :return: Список пар (начало, конец)
+    :raises ValueError: При некорректном формате окна
+    """
+    windows = []
+    for chunk in value.split(","):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        try:
+            start, end = chunk.split("-")
+            windows.append((dt_time.fromisoformat(start.strip()), dt_time.fromisoformat(end.strip())))
+        except ValueError:
+            raise ValueError(f"Invalid drop window: {chunk}")
+    return windows
+
+
+class PollScheduler:
+    """Планировщик опроса каталога с фиксированным интервалом
+
+    После align опросы идут по общей сетке пула anchor + (k + phase) * interval,
+    а не через interval от предыдущего опроса: задержки ответов и джиттер не
+    копятся, и сдвиг фаз между ботами пула сохраняется.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.current_interval = interval
+        self.last_latency: Optional[float] = None  # Задержка последнего ответа, сек
+        self.avg_latency: Optional[float] = None  # Сглаженная задержка ответа, сек
+        self.anchor: Optional[float] = None  # Начало общей сетки опроса (time.monotonic()), None - без сетки
+        self.phase = 0.0  # Сдвиг бота на сетке, доля интервала
+        self.last_tick: Optional[float] = None  # Точка сетки, на которую назначен последний опрос
+
+    def align(self, anchor: float, phase: float) -> None:
+        """Привязать опрос к общей сетке пула
+
+        :param anchor: Начало сетки в шкале time.monotonic()
+        :param phase: Сдвиг этого бота, доля интервала (0 <= phase < 1)
+        """
+        self.anchor = anchor
+        self.phase = phase
+        self.last_tick = None
+
+    def grid_interval(self) -> float:
+        """Шаг сетки опроса"""
+        return self.interval
+
+    def grid_delay(self, step: float, pause: float = 0.0, now: Optional[float] = None) -> float:
+        """Пауза до ближайшей точки сетки с шагом step позже now + pause
+
+        Точка всегда берется позже предыдущей: если опрос проснулся раньше своей
+        точки (отрицательный джиттер) и успел закончиться до нее, следующий опрос
+        не попадет в тот же слот.
+        """
+        now = time.monotonic() if now is None else now
+        offset = self.anchor + self.phase * step
+        index = math.floor((now + pause - offset) / step) + 1
+        if self.last_tick is not None:
+            # Предыдущая точка округляется до ближайшей на текущей сетке
+            index = max(index, round((self.last_tick - offset) / step) + 1)
+        self.last_tick = offset + index * step
+        return self.last_tick - now
+
+    def record_success(self, latency: float, changed: bool = False) -> None:
+        """Учесть успешный опрос
+
+        :param latency: Время ответа API в секундах
+        :param changed: Изменился ли каталог
+        """
+        self.last_latency = latency
+        if self.avg_latency is None:
+            self.avg_latency = latency
+        else:
+            self.avg_latency = 0.8 * self.avg_latency + 0.2 * latency
+
+    def record_error(self, error: Exception) -> None:
+        """Учесть неудачный опрос"""
+
+    def trigger_burst(self) -> None:
+        """Ускорить опрос после изменения каталога"""
+
+    def next_delay(self) -> float:
+        """Пауза до следующего опроса с учетом времени последнего ответа"""
+        self.current_interval = self.interval
+        return max(0.0, self.current_interval - (self.last_latency or 0.0))
+
+    def aligned_delay(self) -> float:
+        """Пауза до следующего опроса по сетке"""
+        self.current_interval = self.interval
+        return self.grid_delay(self.interval)
+
+    async def wait(self) -> None:
+        """Дождаться следующего опроса"""
+        await asyncio.sleep(self.next_delay() if self.anchor is None else self.aligned_delay())
+
+
+class AdaptivePollScheduler(PollScheduler):
+    """Планировщик с джиттером, burst-режимом и отступлением при ошибках"""
+
+    def __init__(
+        self,
+        interval: float = 1.0,
+        jitter: float = 0.0,
+        burst_interval: float = 0.25,
+        burst_duration: float = 30.0,
+        drop_windows: Optional[List[Tuple[dt_time, dt_time]]] = None,
+        max_backoff: float = 30.0
+    ):
+        super().__init__(interval)
+        self.jitter = jitter
+        self.burst_interval = burst_interval
+        self.burst_duration = burst_duration
+        self.drop_windows = drop_windows or []
+        self.max_backoff = max_backoff
+
+        self._burst_until = 0.0
+        self._retry_after = 0.0
+        self._error_streak = 0
+
+    @property
+    def in_burst(self) -> bool:
+        """Включен ли burst-режим"""
+        return time.monotonic() < self._burst_until or self._in_drop_window()
+
+    def _in_drop_window(self) -> bool:
+        now = datetime.now(timezone.utc).time()
+        for start, end in self.drop_windows:
+            if start <= end:
+                if start <= now <= end:
+                    return True
+            # Окно переходит через полночь
+            elif now >= start or now <= end:
+                return True
+        return False
+
+    def trigger_burst(self) -> None:
+        """Перейти в burst-режим на burst_duration секунд"""
+        if not self.in_burst:
+            logger.info(f"Опрос каталога переходит в burst-режим на {self.burst_duration} сек")
+        self._burst_until = time.monotonic() + self.burst_duration
+
+    def record_success(self, latency: float, changed: bool = False) -> None:
+        super().record_success(latency, changed)
+        self._error_streak = 0
+        self._retry_after = 0.0
+        if changed:
+            self.trigger_burst()
+
+    def record_error(self, error: Exception) -> None:
+        self.last_latency = None
+        if isinstance(error, TelegramRetryAfter):
+            self._retry_after = float(error.retry_after)
+            logger.warning(f"Опрос каталога упёрся в лимит, пауза {self._retry_after} сек")
+        elif isinstance(error, NETWORK_ERRORS):
+            self._error_streak += 1
+            logger.warning(f"Сетевая ошибка при опросе каталога ({self._error_streak} подряд)")
+
+    def _forced_pause(self) -> float:
+        """Пауза после retry_after или сетевых ошибок (0 - не нужна)"""
+        if self._retry_after:
+            pause, self._retry_after = self._retry_after, 0.0
+            return pause
+        if self._error_streak:
+            return min(self.interval * 2 ** self._error_streak, self.max_backoff)
+        return 0.0
+
+    def grid_interval(self) -> float:
+        return self.burst_interval if self.in_burst else self.interval
+
+    def next_delay(self) -> float:
+        pause = self._forced_pause()
+        if pause:
+            self.current_interval = pause
+            return pause
+
+        self.current_interval = self.grid_interval()
+        delay = self.current_interval
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(0.0, delay - (self.last_latency or 0.0))
+
+    def aligned_delay(self) -> float:
+        # Пауза после ошибок выдерживается целиком, затем опрос возвращается в свою фазу
+        pause = self._forced_pause()
+        step = self.grid_interval()
+        self.current_interval = pause or step
+        delay = self.grid_delay(step, pause)
+        if self.jitter:
+            # Джиттер сдвигает точку сетки, но не накапливается между опросами
+            delay += step * random.uniform(-self.jitter, self.jitter) / 2
+        return max(0.0, delay)
+
+
+def create_poll_scheduler() -> PollScheduler:
+    """Создать планировщик опроса по настройкам"""
+    return AdaptivePollScheduler(
+        interval=settings.POLL_INTERVAL,
+        jitter=settings.POLL_JITTER,
+        burst_interval=settings.POLL_BURST_INTERVAL,
+        burst_duration=settings.POLL_BURST_DURATION,
+        drop_windows=parse_drop_windows(settings.POLL_DROP_WINDOWS),
+        max_backoff=settings.POLL_MAX_BACKOFF
+    )
@@ -0,0 +1,239 @@
+import asyncio
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetAvailableGifts, GetUpdates, SendGift, TelegramMethod
+from loguru import logger
+
+from app.services.metrics import API_RETRY_AFTER
+
+ChatId = Union[int, str]
+
+# Методы, которые не расходуют лимиты отправки (у опроса свой планировщик)
+UNLIMITED_METHODS = (GetUpdates, GetAvailableGifts)
+
+
+class Priority(IntEnum):
+    """Классы приоритета запросов к Telegram API (меньше - важнее)"""
+    PURCHASE = 0
+    NOTIFICATION = 1
+    ERROR_REPORT = 2
+
+
+_current_priority: ContextVar[Optional[Priority]] = ContextVar("api_priority", default=None)
+
+
+@contextmanager
+def api_priority(priority: Priority) -> Iterator[None]:
+    """Задать приоритет запросов к API внутри блока"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class TokenBucket:
+    """Корзина токенов с возможностью паузы"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Сколько секунд ждать до появления токена"""
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        """Забрать токен"""
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Не выдавать токены указанное время"""
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0
+
+    @property
+    def idle(self) -> bool:
+        """Корзина полна и не на паузе"""
+        now = time.monotonic()
+        return now >= self.paused_until and self.delay(now) == 0 and self.tokens >= self.capacity
+
+
+class ApiRateScheduler:
+    """Планировщик запросов к API: общая корзина, корзины чатов и приоритеты"""
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        global_burst: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        max_chat_buckets: int = 10000
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_chat_buckets = max_chat_buckets
+
+        self._chat_buckets: Dict[ChatId, TokenBucket] = {}
+        self._waiters: List[Tuple[int, int, Optional[ChatId], asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _chat_bucket(self, chat_id: ChatId) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.max_chat_buckets:
+                # Забываем корзины чатов, которые давно не использовались
+                self._chat_buckets = {key: value for key, value in self._chat_buckets.items() if not value.idle}
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    @property
+    def pending(self) -> int:
+        """Количество ожидающих запросов"""
+        return len(self._waiters)
+
+    async def acquire(self, priority: Priority, chat_id: Optional[ChatId] = None) -> None:
+        """Дождаться разрешения на запрос
+
+        :param priority: Приоритет запроса
+        :param chat_id: Чат, в который идет запрос (None - только общий лимит)
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((int(priority), next(self._counter), chat_id, future))
+        self._waiters.sort(key=lambda waiter: waiter[:2])
+
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+
+        await future
+
+    def set_global_limit(self, rate: float, burst: float) -> None:
+        """Изменить общий лимит, например при делении токена между процессами"""
+        bucket = self.global_bucket
+        bucket.rate = rate
+        bucket.capacity = burst
+        bucket.tokens = min(bucket.tokens, burst)
+
+    def pause(self, seconds: float, chat_id: Optional[ChatId] = None) -> None:
+        """Приостановить выдачу разрешений после ответа retry_after
+
+        :param seconds: Пауза в секундах
+        :param chat_id: Чат, для которого пришел лимит (None - общий лимит)
+        """
+        bucket = self._chat_bucket(chat_id) if chat_id is not None else self.global_bucket
+        bucket.pause(seconds)
+        logger.warning(f"Лимит Telegram API: пауза {seconds} сек для {chat_id if chat_id is not None else 'всех чатов'}")
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _grant(self) -> float:
+        """Выдать разрешение первому готовому запросу
+
+        :return: 0, если разрешение выдано, иначе время до следующей попытки
+        """
+        now = time.monotonic()
+        next_attempt = float("inf")
+
+        for waiter in list(self._waiters):
+            _, _, chat_id, future = waiter
+            if future.done():
+                self._waiters.remove(waiter)
+                continue
+
+            # Общий лимит один на всех: очередь ждет самого важного запроса
+            global_delay = self.global_bucket.delay(now)
+            if global_delay > 0:
+                return global_delay
+
+            # Чат упёрся в свой лимит - пропускаем вперед запросы в другие чаты
+            chat_bucket = self._chat_bucket(chat_id) if chat_id is not None else None
+            chat_delay = chat_bucket.delay(now) if chat_bucket else 0.0
+            if chat_delay > 0:
+                next_attempt = min(next_attempt, chat_delay)
+                continue
+
+            self.global_bucket.take(now)
+            if chat_bucket:
+                chat_bucket.take(now)
+            self._waiters.remove(waiter)
+            future.set_result(None)
+            return 0.0
+
+        return next_attempt
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            self._wakeup.clear()
+            delay = self._grant()
+            if delay == 0.0:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=None if delay == float("inf") else delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """Пропускает запросы бота через планировщик лимитов
+
+    После retry_after ставит планировщик на паузу и повторяет запрос до
+    max_retries раз. SendGift не повторяется: ошибка уходит в RetryPolicy.
+    """
+
+    def __init__(self, scheduler: ApiRateScheduler, max_retries: int = 3):
+        self.scheduler = scheduler
+        self.max_retries = max_retries
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod):
+        if isinstance(method, UNLIMITED_METHODS):
+            return await make_request(bot, method)
+
+        priority = _current_priority.get()
+        if priority is None:
+            priority = Priority.PURCHASE if isinstance(method, SendGift) else Priority.NOTIFICATION
+        # Покупки ограничены только общим лимитом, остальное - еще и лимитом чата
+        chat_id = None if isinstance(method, SendGift) else getattr(method, "chat_id", None)
+
+        attempt = 0
+        while True:
+            await self.scheduler.acquire(priority, chat_id)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.scheduler.pause(e.retry_after, chat_id)
+                if isinstance(method, SendGift):
+                    # Повторы отправки подарков ведет RetryPolicy с дедлайном дропа, второй слой их бы умножил
+                    raise
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                API_RETRY_AFTER.inc(type(method).__name__)
+                logger.warning(f"{type(method).__name__}: retry_after {e.retry_after} сек, попытка {attempt}")
@@ -0,0 +1,166 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Awaitable, Callable, Optional, Tuple
+
+from aiohttp import ClientConnectorError, ClientError
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from loguru import logger
+
+from app.config import settings
+
+
+class ErrorClass(str, Enum):
+    """Классы ошибок Telegram API для повторов"""
+    RETRYABLE = "retryable"  # Запрос не дошел до API (соединение не установлено) - повторить с backoff
+    RATE_LIMITED = "rate_limited"  # 429 - повторить через retry_after
+    UNKNOWN = "unknown"  # Запрос мог дойти до API (таймаут, обрыв, 5xx) - повтор может отправить подарок дважды
+    FATAL = "fatal"  # Повтор не поможет
+
+
+class SendOutcome(str, Enum):
+    """Итог отправки подарка"""
+    SENT = "sent"
+    SOLD_OUT = "sold_out"  # Подарок закончился или больше не продается
+    BOT_BALANCE = "bot_balance"  # У бота не хватает звезд
+    BAD_RECIPIENT = "bad_recipient"  # Получатель недоступен
+    DEADLINE = "deadline"  # Не успели до дедлайна дропа
+    UNKNOWN = "unknown"  # Подарок мог уйти, исход решает админ
+    FAILED = "failed"  # Прочие фатальные ошибки
+
+
+# Фрагменты описаний ошибок Bot API и соответствующие итоги
+FATAL_DESCRIPTIONS = (
+    (SendOutcome.SOLD_OUT, ("STARGIFT_USAGE_LIMITED", "STARGIFT_INVALID", "sold out", "gift not found")),
+    (SendOutcome.BOT_BALANCE, ("BALANCE_TOO_LOW", "not enough stars", "STARS_INSUFFICIENT")),
+    (SendOutcome.BAD_RECIPIENT, ("USER_ID_INVALID", "PEER_ID_INVALID", "chat not found", "user not found", "bot was blocked")),
+)
+
+# Ошибки, после которых неизвестно, обработал ли Bot API запрос
+UNKNOWN_OUTCOME_ERRORS = (TelegramNetworkError, TelegramServerError, ClientError, asyncio.TimeoutError)
+
+
+def request_not_sent(error: BaseException) -> bool:
+    """Запрос точно не дошел до API: не удалось установить соединение
+
+    aiogram заворачивает ошибки aiohttp в TelegramNetworkError, исходная
+    ошибка остается в __context__.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, ClientConnectorError):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def classify_error(error: BaseException) -> Tuple[ErrorClass, SendOutcome]:
+    """Определить класс ошибки отправки подарка
+
+    sendGift не идемпотентен, поэтому повторяется только запрос, который
+    до API не дошел (429, ошибка соединения). После таймаута, обрыва
+    соединения, 5xx и неизвестных ошибок подарок мог уйти - исход неизвестен.
+
+    :return: Класс ошибки и итог, если повторять не нужно
+    """
+    if isinstance(error, TelegramRetryAfter):
+        return ErrorClass.RATE_LIMITED, SendOutcome.FAILED
+    if request_not_sent(error):
+        return ErrorClass.RETRYABLE, SendOutcome.FAILED
+    if isinstance(error, UNKNOWN_OUTCOME_ERRORS):
+        return ErrorClass.UNKNOWN, SendOutcome.UNKNOWN
+    if isinstance(error, TelegramForbiddenError):
+        return ErrorClass.FATAL, SendOutcome.BAD_RECIPIENT
+    if isinstance(error, (TelegramBadRequest, TelegramNotFound)):
+        description = str(error).lower()
+        for outcome, fragments in FATAL_DESCRIPTIONS:
+            if any(fragment.lower() in description for fragment in fragments):
+                return ErrorClass.FATAL, outcome
+        return ErrorClass.FATAL, SendOutcome.FAILED
+    return ErrorClass.UNKNOWN, SendOutcome.UNKNOWN
+
+
+@dataclass
+class SendResult:
+    """Результат отправки с повторами"""
+    outcome: SendOutcome
+    attempts: int
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome == SendOutcome.SENT
+
+
+class RetryPolicy:
+    """Повторы отправки с экспоненциальной задержкой, jitter и дедлайном
+
+    Повторяются только 429 и запросы, не дошедшие до API (см. classify_error).
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        multiplier: float = 2.0,
+        jitter: float = 0.2
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def backoff(self, attempt: int) -> float:
+        """Задержка перед повтором после attempt неудачных попыток"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def run(
+        self,
+        call: Callable[[int], Awaitable[None]],
+        deadline: float,
+        on_retry: Optional[Callable[[int, BaseException, float], None]] = None
+    ) -> SendResult:
+        """Выполнять call, пока он не пройдет, не упадет фатально или не истечет дедлайн
+
+        :param call: Попытка отправки, получает номер попытки
+        :param deadline: Дедлайн в шкале time.monotonic()
+        :param on_retry: Вызывается перед каждым повтором (попытка, ошибка, задержка)
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await call(attempt)
+                return SendResult(SendOutcome.SENT, attempt)
+            except Exception as e:
+                error_class, outcome = classify_error(e)
+                if error_class in (ErrorClass.FATAL, ErrorClass.UNKNOWN):
+                    return SendResult(outcome, attempt, e)
+
+                delay = e.retry_after if error_class == ErrorClass.RATE_LIMITED else self.backoff(attempt)
+                if time.monotonic() + delay > deadline:
+                    logger.warning(f"Дедлайн отправки истек после {attempt} попыток: {e}")
+                    return SendResult(SendOutcome.DEADLINE, attempt, e)
+                if on_retry is not None:
+                    on_retry(attempt, e, delay)
+                await asyncio.sleep(delay)
+
+
+def create_retry_policy() -> RetryPolicy:
+    """Политика повторов отправки подарков из настроек"""
+    return RetryPolicy(
+        base_delay=settings.SEND_RETRY_BASE_DELAY,
+        max_delay=settings.SEND_RETRY_MAX_DELAY,
+        jitter=settings.SEND_RETRY_JITTER
+    )
@@ -0,0 +1,108 @@
+import asyncio
+import multiprocessing
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from app.config import settings
+from app.database.cache import PurchaseSettingsCache, purchase_cache
+from app.services.ipc import IpcClient, IpcServer
+
+
+class SniperMode:
+    """Режимы запуска покупки подарков"""
+    INLINE = "inline"  # В одном цикле событий с хендлерами
+    PROCESS = "process"  # В отдельном процессе со своим циклом событий и движком БД
+
+
+async def apply_cache_message(cache: PurchaseSettingsCache, message: Dict[str, Any]) -> None:
+    """Применить к кэшу изменение, пришедшее из процесса хендлеров"""
+    op = message.pop("op", None)
+    if op == "settings":
+        cache.apply_settings(**message)
+    elif op == "balance":
+        cache.apply_balance(**message)
+    else:
+        logger.warning(f"Неизвестная IPC операция: {op}")
+
+
+def forward_cache_changes(cache: PurchaseSettingsCache, client: IpcClient) -> None:
+    """Пересылать изменения кэша процесса хендлеров в процесс покупки"""
+    cache.add_listener(lambda op, data: client.send({"op": op, **data}))
+
+
+async def _run_sniper(socket_path: str) -> None:
+    from app.database.engine import init_db
+    from app.loader import set_rate_share
+    from app.services.gifts import GiftService
+
+    # app.loader мог быть импортирован еще при загрузке __mp_main__ с долей хендлеров,
+    # поэтому долю процесса покупки задаем явно
+    set_rate_share(settings.BOT_TOKEN, 1.0 - settings.RATE_HANDLER_SHARE)
+    await init_db()
+    if settings.METRICS_ENABLED:
+        from app.services.metrics import start_metrics_server
+        await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT + 1)
+    gift_service = GiftService()
+    server = IpcServer(socket_path, lambda message: apply_cache_message(purchase_cache, message))
+    await server.start()
+    logger.info("Процесс покупки подарков запущен")
+    try:
+        await gift_service.check_and_purchase_gifts()
+    finally:
+        await server.stop()
+
+
+def run_sniper(socket_path: str) -> None:
+    """Точка входа процесса покупки подарков"""
+    asyncio.run(_run_sniper(socket_path))
+
+
+class SniperProcess:
+    """Процесс покупки подарков, управляемый процессом хендлеров"""
+
+    def __init__(self, socket_path: str = settings.IPC_SOCKET_PATH, restart_delay: float = 5.0):
+        self.socket_path = socket_path
+        self.restart_delay = restart_delay
+        self.client = IpcClient(socket_path)
+        self._process: Optional[multiprocessing.Process] = None
+        self._running = False
+
+    def _spawn(self) -> None:
+        # spawn - чтобы дочерний процесс не унаследовал цикл событий и соединения БД
+        context = multiprocessing.get_context("spawn")
+        self._process = context.Process(
+            target=run_sniper,
+            args=(self.socket_path,),
+            name="gift-sniper",
+            daemon=True
+        )
+        self._process.start()
+        logger.info(f"Запущен процесс покупки подарков, pid {self._process.pid}")
+
+    async def run(self) -> None:
+        """Запустить процесс и перезапускать его при падении"""
+        self._running = True
+        forward_cache_changes(purchase_cache, self.client)
+        self.client.start()
+        try:
+            while self._running:
+                self._spawn()
+                while self._process.is_alive():
+                    await asyncio.sleep(1)
+                if self._running:
+                    logger.error(
+                        f"Процесс покупки подарков завершился с кодом {self._process.exitcode}, "
+                        f"перезапуск через {self.restart_delay} сек"
+                    )
+                    await asyncio.sleep(self.restart_delay)
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """Остановить процесс покупки подарков"""
+        self._running = False
+        self.client.stop()
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=10)
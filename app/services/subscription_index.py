@@ -0,0 +1,100 @@
+from bisect import bisect_right, insort
+from typing import Dict, Iterable, List, Set, Tuple
+
+from loguru import logger
+
+# Ключ фильтра: (min_price, max_price, supply_limit), 0 - без ограничения
+FilterKey = Tuple[int, int, int]
+
+
+class SubscriptionIndex:
+    """Индекс подписок автопокупки для поиска пользователей по подарку
+
+    Пользователи группируются по одинаковым фильтрам, а группы упорядочены
+    по минимальной цене. Для подарка бинарным поиском отбираются группы с
+    подходящим минимумом, остальные условия проверяются на уровне группы,
+    а не пользователя. Поиск стоит O(log g + g_p + k), где g - число групп,
+    g_p <= g - группы с min_price <= цены подарка, k - число совпавших
+    пользователей; в худшем случае это O(g + k). От числа подписчиков
+    стоимость зависит только через k, а g ограничено кнопками настроек.
+    """
+
+    def __init__(self):
+        self._groups: Dict[FilterKey, Set[int]] = {}
+        self._user_keys: Dict[int, FilterKey] = {}
+        self._by_min_price: List[Tuple[int, FilterKey]] = []
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._user_keys)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._user_keys
+
+    def load(self, settings_rows: Iterable) -> None:
+        """Построить индекс заново по включенным настройкам автопокупки"""
+        self._groups.clear()
+        self._user_keys.clear()
+        self._by_min_price.clear()
+        for settings in settings_rows:
+            self.upsert(
+                settings.user_id,
+                is_enabled=settings.is_enabled,
+                min_price=settings.min_price,
+                max_price=settings.max_price,
+                supply_limit=settings.supply_limit
+            )
+        self.loaded = True
+        logger.info(f"Индекс подписок построен: {len(self)} пользователей, {len(self._groups)} фильтров")
+
+    def upsert(self, user_id: int, is_enabled: bool, min_price: int, max_price: int, supply_limit: int) -> None:
+        """Добавить или обновить подписку пользователя"""
+        if not is_enabled:
+            self.remove(user_id)
+            return
+
+        key = (min_price or 0, max_price or 0, supply_limit or 0)
+        if self._user_keys.get(user_id) == key:
+            return
+        self.remove(user_id)
+
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = set()
+            insort(self._by_min_price, (key[0], key))
+        group.add(user_id)
+        self._user_keys[user_id] = key
+
+    def remove(self, user_id: int) -> None:
+        """Удалить подписку пользователя"""
+        key = self._user_keys.pop(user_id, None)
+        if key is None:
+            return
+        group = self._groups[key]
+        group.discard(user_id)
+        if not group:
+            del self._groups[key]
+            self._by_min_price.remove((key[0], key))
+
+    def match(self, price: int, total_count: int) -> Set[int]:
+        """Найти пользователей, которым подходит подарок
+
+        :param price: Цена подарка
+        :param total_count: Общий саплай подарка
+        :return: Множество ID пользователей
+        """
+        matched: Set[int] = set()
+        # Группы с min_price <= price (min_price = 0 - без ограничения)
+        end = bisect_right(self._by_min_price, (price, (price, float("inf"), float("inf"))))
+        for i in range(end):
+            min_price, max_price, supply_limit = self._by_min_price[i][1]
+            if max_price > 0 and price > max_price:
+                continue
+            if supply_limit > 0 and total_count > supply_limit:
+                continue
+            matched |= self._groups[(min_price, max_price, supply_limit)]
+        return matched
+
+
+# Общий индекс процесса, обновляется из CRUD при изменении настроек
+subscription_index = SubscriptionIndex()
@@ -0,0 +1,215 @@
+"""Трассировка пути подарка от обнаружения до покупки
+
+Спаны пишутся JSON-строками в ротируемый файл (TRACE_FILE) и связываются
+по ID дропа. Водопад для дропа:
+
+    python -m app.services.tracing [drop_id] [--file logs/trace.jsonl]
+
+Без drop_id выводится список последних дропов.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import queue
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import settings
+
+_trace_logger = logging.getLogger("gift_trace")
+_trace_logger.propagate = False
+_listener: Optional[QueueListener] = None
+
+
+@dataclass
+class Span:
+    """Отрезок работы внутри дропа"""
+    trace_id: str
+    name: str
+    parent_id: Optional[str] = None
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    started: float = field(default_factory=time.time)
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attrs: Any) -> None:
+        """Добавить атрибуты спана"""
+        self.attrs.update(attrs)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def new_drop_id() -> str:
+    """Новый ID дропа"""
+    return uuid.uuid4().hex[:12]
+
+
+def setup_tracing(path: str = settings.TRACE_FILE) -> None:
+    """Подключить запись спанов в ротируемый файл
+
+    Запись в файл идет в отдельном потоке, горячий путь только кладет
+    строку в очередь.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=settings.TRACE_MAX_BYTES,
+        backupCount=settings.TRACE_BACKUP_COUNT,
+        encoding="utf-8"
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _trace_logger.addHandler(QueueHandler(records))
+    _trace_logger.setLevel(logging.INFO)
+    _listener = QueueListener(records, handler)
+    _listener.start()
+
+
+def _write(span: Span, duration: float, error: Optional[str] = None) -> None:
+    record = {
+        "t": span.trace_id,
+        "s": span.span_id,
+        "p": span.parent_id,
+        "n": span.name,
+        "ts": round(span.started, 6),
+        "d": round(duration * 1000, 3),
+    }
+    if span.attrs:
+        record["a"] = span.attrs
+    if error:
+        record["e"] = error
+    _trace_logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attrs: Any) -> Iterator[Optional[Span]]:
+    """Спан внутри текущего дропа
+
+    Без текущего спана и без trace_id ничего не пишется, поэтому код вне
+    дропа не платит за трассировку.
+
+    :param name: Название спана
+    :param trace_id: ID дропа для корневого спана
+    """
+    parent = _current_span.get()
+    if _listener is None or (parent is None and trace_id is None):
+        yield None
+        return
+
+    current = Span(
+        trace_id=trace_id or parent.trace_id,
+        name=name,
+        parent_id=parent.span_id if parent is not None and trace_id in (None, parent.trace_id) else None,
+        attrs=attrs
+    )
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        _write(current, time.perf_counter() - started, error)
+
+
+def record_span(trace_id: str, name: str, started: float, duration: float, **attrs: Any) -> None:
+    """Записать уже завершившийся спан, например опрос, обнаруживший дроп
+
+    :param started: Начало, time.time()
+    :param duration: Длительность, сек
+    """
+    if _listener is None:
+        return
+    _write(Span(trace_id=trace_id, name=name, started=started, attrs=attrs), duration)
+
+
+# Водопад
+
+
+def load_spans(path: str, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Прочитать спаны из файла и его ротированных копий"""
+    spans = []
+    for file_path in sorted(glob.glob(f"{glob.escape(path)}*")):
+        with open(file_path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if trace_id is None or record["t"] == trace_id:
+                    spans.append(record)
+    return spans
+
+
+def render_waterfall(spans: List[Dict[str, Any]], width: int = 50) -> str:
+    """Водопад спанов одного дропа"""
+    if not spans:
+        return "Спаны не найдены"
+    begin = min(record["ts"] for record in spans)
+    end = max(record["ts"] + record["d"] / 1000 for record in spans)
+    total = max(end - begin, 1e-6)
+
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    known = {record["s"] for record in spans}
+    for record in sorted(spans, key=lambda record: record["ts"]):
+        parent = record["p"] if record["p"] in known else None
+        children.setdefault(parent, []).append(record)
+
+    lines = [f"Дроп {spans[0]['t']}: {total * 1000:.1f} мс, спанов {len(spans)}"]
+
+    def walk(parent: Optional[str], depth: int) -> None:
+        for record in children.get(parent, []):
+            offset = (record["ts"] - begin) / total
+            length = max(record["d"] / 1000 / total, 1 / width)
+            bar = " " * int(offset * width) + "█" * max(int(length * width), 1)
+            label = "  " * depth + record["n"]
+            attrs = " ".join(f"{key}={value}" for key, value in record.get("a", {}).items())
+            error = f" ! {record['e']}" if "e" in record else ""
+            lines.append(
+                f"{label:<40.40} |{bar:<{width}.{width}}| "
+                f"+{(record['ts'] - begin) * 1000:8.1f} {record['d']:9.1f} мс {attrs}{error}"
+            )
+            walk(record["s"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("drop_id", nargs="?")
+    parser.add_argument("--file", default=settings.TRACE_FILE)
+    parser.add_argument("--limit", type=int, default=20, help="Сколько последних дропов показать")
+    args = parser.parse_args()
+
+    if args.drop_id:
+        print(render_waterfall(load_spans(args.file, args.drop_id)))
+        return
+
+    drops: Dict[str, List[float]] = {}
+    for record in load_spans(args.file):
+        bounds = drops.setdefault(record["t"], [record["ts"], record["ts"]])
+        bounds[0] = min(bounds[0], record["ts"])
+        bounds[1] = max(bounds[1], record["ts"] + record["d"] / 1000)
+    for drop_id, (begin, end) in sorted(drops.items(), key=lambda item: item[1][0])[-args.limit:]:
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(begin))
+        print(f"{drop_id}  {started}  {(end - begin) * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Бенчмарк задержки от появления подарка до его доставки
+
+Поднимает фейковый Bot API (benchmarks.fake_bot_api) и синтетическую БД,
+запускает GiftService.check_and_purchase_gifts и скриптует дроп подарка.
+Для каждого размера БД измеряет:
+    detection   - от дропа до события NEW_GIFT в шине каталога
+    first_send  - от дропа до первого sendGift
+    last_send   - от дропа до последнего sendGift
+    throughput  - sendGift в секунду между первым и последним
+    db_time     - суммарное время запросов к БД и их количество
+    peak_rss    - пиковый RSS процесса
+    peak_memory - пик памяти Python (tracemalloc, только с --trace-memory:
+                  tracemalloc в разы замедляет прогон и искажает задержки)
+
+Каждый размер запускается в отдельном процессе с чистой БД.
+
+Запуск: python -m benchmarks.drop_latency [--users 1000 10000 100000] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from benchmarks.subscription_index import make_settings
+
+DROP_GIFT_ID = "6028601630662853006"
+
+
+def build_scenario(drop_at: float, supply: int, price: int, send_latency_ms: float) -> Dict[str, Any]:
+    """Сценарий фейкового API с одним дропом"""
+    return {
+        "gifts": [{"id": "5170145012310081615", "star_count": 15}],
+        "drops": [{"at": drop_at, "id": DROP_GIFT_ID, "star_count": price, "total_count": supply}],
+        "latency": {
+            "default": {"dist": "fixed", "ms": 5},
+            "sendGift": {"dist": "fixed", "ms": send_latency_ms},
+        },
+    }
+
+
+async def seed_database(users: int, seed: int) -> None:
+    """Заполнить БД пользователями со случайными настройками и балансами"""
+    import random
+    from sqlalchemy import insert
+
+    from app.database.engine import get_session, init_db
+    from app.database.models import AutoPurchaseSettings, User
+
+    await init_db()
+    rng = random.Random(seed)
+    rows = make_settings(users, seed)
+    async with get_session() as session:
+        for start in range(0, users, 5000):
+            chunk = rows[start:start + 5000]
+            await session.execute(insert(User), [
+                {"user_id": 1_000_000 + row.user_id, "username": f"user{row.user_id}", "balance": rng.randint(0, 5000), "admin": False}
+                for row in chunk
+            ])
+            await session.execute(insert(AutoPurchaseSettings), [
+                {
+                    "user_id": 1_000_000 + row.user_id,
+                    "is_enabled": rng.random() < 0.8,
+                    "min_price": row.min_price,
+                    "max_price": row.max_price,
+                    "supply_limit": row.supply_limit,
+                    "purchase_cycles": rng.randint(1, 3)
+                }
+                for row in chunk
+            ])
+        await session.commit()
+
+
+async def run_scenario(args: argparse.Namespace) -> Dict[str, Any]:
+    """Прогон одного размера БД в текущем процессе"""
+    from aiohttp import web
+    from loguru import logger
+    from sqlalchemy import event
+
+    from benchmarks.fake_bot_api import create_app
+    from app.database.engine import engine
+    from app.loader import bot
+    from app.services.catalog import CatalogEventType
+    from app.services.gifts import GiftService
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    seed_started = time.perf_counter()
+    await seed_database(args.users, args.seed)
+    seed_time = time.perf_counter() - seed_started
+
+    # Время запросов к БД считаем с момента запуска сервиса
+    db = {"queries": 0, "time": 0.0}
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        context._benchmark_started = time.perf_counter()
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        db["queries"] += 1
+        db["time"] += time.perf_counter() - context._benchmark_started
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_execute)
+
+    app = create_app(build_scenario(args.drop_at, args.supply, args.price, args.send_latency_ms), seed=args.seed)
+    api = app["api"]
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    service = GiftService(bots=[bot])
+    events = service.event_bus.subscribe()
+
+    if args.trace_memory:
+        tracemalloc.start()
+    api.started = time.monotonic()
+    worker = asyncio.create_task(service.check_and_purchase_gifts())
+
+    detected_at = None
+    deadline = time.monotonic() + args.timeout
+    try:
+        while detected_at is None and time.monotonic() < deadline:
+            try:
+                catalog_event = await asyncio.wait_for(events.get(), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                break
+            if catalog_event is not None and catalog_event.type == CatalogEventType.NEW_GIFT \
+                    and catalog_event.gift["id"] == DROP_GIFT_ID:
+                detected_at = api.elapsed()
+
+        # Ждем, пока воркеры разберут outbox
+        await asyncio.sleep(0.5)
+        while (service.is_distributing or service.distribution.busy) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+    finally:
+        peak_memory = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+        tracemalloc.stop()
+        service.stop()
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        await runner.cleanup()
+        await bot.session.close()
+
+    sends = [entry["at"] for entry in api.log if entry["method"] == "sendGift"]
+    first_send = min(sends) - args.drop_at if sends else None
+    last_send = max(sends) - args.drop_at if sends else None
+    duration = (max(sends) - min(sends)) if len(sends) > 1 else 0.0
+    return {
+        "users": args.users,
+        "seed_time": seed_time,
+        "detection": detected_at - args.drop_at if detected_at is not None else None,
+        "first_send": first_send,
+        "last_send": last_send,
+        "sends": len(sends),
+        "throughput": len(sends) / duration if duration else None,
+        "messages": sum(1 for entry in api.log if entry["method"] == "sendMessage"),
+        "db_queries": db["queries"],
+        "db_time": db["time"],
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "peak_memory": peak_memory,
+        "timed_out": detected_at is None or time.monotonic() >= deadline,
+    }
+
+
+def run_single(args: argparse.Namespace) -> None:
+    """Прогон одного размера в отдельном процессе, результат - JSON в stdout"""
+    args.users = args.users[0]
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{directory}/benchmark.sqlite3"
+        os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{args.port}"
+        os.environ.setdefault("BOT_TOKEN", "123456:benchmark")
+        os.environ["POLL_INTERVAL"] = str(args.poll_interval)
+        os.environ["POLL_BOT_TOKENS"] = ""
+        os.environ["RATE_LIMIT_ENABLED"] = "true" if args.rate_limit else "false"
+        os.environ["DISTRIBUTION_CONCURRENCY"] = str(args.concurrency)
+        result = asyncio.run(run_scenario(args))
+    print(json.dumps(result))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--supply", type=int, default=2000, help="Саплай дропнутого подарка")
+    parser.add_argument("--price", type=int, default=50, help="Цена дропнутого подарка")
+    parser.add_argument("--drop-at", type=float, default=3.0, help="Момент дропа от старта сервиса, сек")
+    parser.add_argument("--send-latency-ms", type=float, default=20.0)
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rate-limit", action="store_true", help="Включить лимиты Telegram API")
+    parser.add_argument("--trace-memory", action="store_true", help="Мерить пик памяти через tracemalloc")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Файл для результатов (по умолчанию stdout)")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single(args)
+        return
+
+    results: List[Dict[str, Any]] = []
+    for users in args.users:
+        command = [sys.executable, "-m", "benchmarks.drop_latency", "--single", "--users", str(users)]
+        for name in ("supply", "price", "drop_at", "send_latency_ms", "poll_interval", "concurrency", "timeout", "port", "seed"):
+            command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+        for flag in ("rate_limit", "trace_memory"):
+            if getattr(args, flag):
+                command.append(f"--{flag.replace('_', '-')}")
+        completed = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(
+            f"users={users}: detection {result['detection']}, first send {result['first_send']}, "
+            f"last send {result['last_send']}, {result['sends']} sends, db {result['db_time']:.3f} s "
+            f"in {result['db_queries']} queries, peak RSS {result['peak_rss'] / 1024 / 1024:.1f} MiB",
+            file=sys.stderr
+        )
+
+    report = {
+        "benchmark": "drop_latency",
+        "timestamp": time.time(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("output", "single")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
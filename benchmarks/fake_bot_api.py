@@ -0,0 +1,354 @@
+"""Локальная замена Telegram Bot API для нагрузочных тестов без сети
+
+Запуск: python -m benchmarks.fake_bot_api [--port 8081] [--scenario benchmarks/scenarios/drop.json]
+Бот подключается к серверу через TELEGRAM_API_URL=http://127.0.0.1:8081
+
+Сценарий (JSON):
+    gifts        - подарки, доступные с самого начала
+    drops        - подарки, появляющиеся через "at" секунд после старта
+    depletion    - сколько штук подарка в секунду раскупают "другие" покупатели
+    star_balance - баланс звезд бота (null - без ограничения)
+    latency      - задержки ответов: "default" и по имени метода
+    flood        - вероятность ответа 429 и retry_after: "default" и по имени метода
+
+Распределения задержки (в миллисекундах):
+    {"dist": "fixed", "ms": 50}
+    {"dist": "uniform", "min_ms": 20, "max_ms": 80}
+    {"dist": "normal", "mean_ms": 50, "stddev_ms": 10}
+    {"dist": "lognormal", "median_ms": 50, "sigma": 0.5}
+
+Служебные эндпоинты:
+    GET  /_fake/log      - журнал sendGift и sendMessage
+    GET  /_fake/stats    - счетчики запросов, ошибок и задержек по методам
+    POST /_fake/drop     - добавить подарок прямо сейчас (JSON подарка из сценария)
+    POST /_fake/updates  - поставить апдейты в очередь getUpdates (JSON-список Update)
+    POST /_fake/reset    - сбросить журнал и счетчики
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+from loguru import logger
+
+DEFAULT_SCENARIO: Dict[str, Any] = {
+    "gifts": [
+        {"id": "5170145012310081615", "star_count": 15},
+        {"id": "5170233102089322756", "star_count": 25},
+    ],
+    "drops": [
+        {"at": 5.0, "id": "6028601630662853006", "star_count": 50, "total_count": 10000},
+    ],
+    "depletion": {"6028601630662853006": 200},
+    "star_balance": None,
+    "latency": {"default": {"dist": "lognormal", "median_ms": 40, "sigma": 0.4}},
+    "flood": {"default": {"probability": 0.0, "retry_after": 1}},
+}
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Fake Bot", "username": "fake_bot"}
+
+# Методы, на которые достаточно ответить True
+TRUE_METHODS = {
+    "deleteWebhook",
+    "setMyCommands",
+    "deleteMyCommands",
+    "answerCallbackQuery",
+    "answerPreCheckoutQuery",
+    "deleteMessage",
+}
+
+
+class LatencyModel:
+    """Генератор задержек ответа по распределению из сценария"""
+
+    def __init__(self, spec: Optional[Dict[str, Any]] = None, rng: Optional[random.Random] = None):
+        self.spec = spec or {"dist": "fixed", "ms": 0}
+        self.rng = rng or random.Random()
+
+    def sample(self) -> float:
+        """Задержка в секундах"""
+        dist = self.spec.get("dist", "fixed")
+        if dist == "fixed":
+            ms = self.spec.get("ms", 0)
+        elif dist == "uniform":
+            ms = self.rng.uniform(self.spec["min_ms"], self.spec["max_ms"])
+        elif dist == "normal":
+            ms = self.rng.gauss(self.spec["mean_ms"], self.spec["stddev_ms"])
+        elif dist == "lognormal":
+            ms = self.spec["median_ms"] * self.rng.lognormvariate(0, self.spec["sigma"])
+        else:
+            raise ValueError(f"Unknown latency distribution: {dist}")
+        return max(ms, 0) / 1000
+
+
+def make_gift(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Подарок в формате Bot API из описания в сценарии"""
+    total_count = spec.get("total_count")
+    return {
+        "id": spec["id"],
+        "sticker": {
+            "file_id": f"sticker_{spec['id']}",
+            "file_unique_id": f"u_{spec['id']}",
+            "type": "custom_emoji",
+            "width": 512,
+            "height": 512,
+            "is_animated": True,
+            "is_video": False,
+        },
+        "star_count": spec["star_count"],
+        "upgrade_star_count": spec.get("upgrade_star_count"),
+        "total_count": total_count,
+        "remaining_count": spec.get("remaining_count", total_count),
+    }
+
+
+class ApiError(Exception):
+    """Ошибка Bot API в формате ответа Telegram"""
+
+    def __init__(self, code: int, description: str, retry_after: Optional[int] = None):
+        super().__init__(description)
+        self.code = code
+        self.description = description
+        self.retry_after = retry_after
+
+    def to_response(self) -> web.Response:
+        payload: Dict[str, Any] = {"ok": False, "error_code": self.code, "description": self.description}
+        if self.retry_after is not None:
+            payload["parameters"] = {"retry_after": self.retry_after}
+        return web.json_response(payload, status=self.code)
+
+
+class FakeBotApi:
+    """Состояние и обработчики фейкового Bot API"""
+
+    def __init__(self, scenario: Dict[str, Any], seed: Optional[int] = None):
+        self.scenario = scenario
+        self.rng = random.Random(seed)
+        self.started = time.monotonic()
+
+        self.gifts: Dict[str, Dict[str, Any]] = {spec["id"]: make_gift(spec) for spec in scenario.get("gifts", [])}
+        self.pending_drops: List[Dict[str, Any]] = sorted(scenario.get("drops", []), key=lambda drop: drop["at"])
+        self.depletion: Dict[str, float] = dict(scenario.get("depletion", {}))
+        self.star_balance: Optional[int] = scenario.get("star_balance")
+
+        latency = scenario.get("latency", {})
+        self.latency = {method: LatencyModel(spec, self.rng) for method, spec in latency.items()}
+        self.flood = scenario.get("flood", {})
+
+        self.updates: List[Dict[str, Any]] = []
+        self.next_update_id = 1
+        self.updates_event = asyncio.Event()
+        self.next_message_id = 1
+
+        self.log: List[Dict[str, Any]] = []
+        self.stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {"requests": 0, "errors": 0, "latency_total": 0.0})
+        self._depleted_at = self.started
+
+    # Сценарий
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def advance(self) -> None:
+        """Применить дропы и раскупку, наступившие к текущему моменту"""
+        now = time.monotonic()
+        elapsed = now - self.started
+        while self.pending_drops and self.pending_drops[0]["at"] <= elapsed:
+            drop = self.pending_drops.pop(0)
+            self.gifts[drop["id"]] = make_gift(drop)
+            logger.info(f"Дроп подарка {drop['id']} на {elapsed:.2f} сек")
+
+        passed = now - self._depleted_at
+        self._depleted_at = now
+        for gift_id, per_second in self.depletion.items():
+            gift = self.gifts.get(gift_id)
+            if gift is None or not gift["remaining_count"]:
+                continue
+            sold = int(per_second * passed + self.rng.random())
+            gift["remaining_count"] = max(gift["remaining_count"] - sold, 0)
+
+    def _rule(self, table: Dict[str, Any], method: str) -> Optional[Any]:
+        return table.get(method, table.get("default"))
+
+    async def _simulate(self, method: str) -> None:
+        latency = self._rule(self.latency, method)
+        delay = latency.sample() if latency else 0.0
+        self.stats[method]["latency_total"] += delay
+        if delay:
+            await asyncio.sleep(delay)
+
+        flood = self._rule(self.flood, method)
+        if flood and self.rng.random() < flood.get("probability", 0):
+            retry_after = max(int(flood.get("retry_after", 1)), 1)
+            raise ApiError(429, f"Too Many Requests: retry after {retry_after}", retry_after)
+
+    # Методы Bot API
+
+    async def get_available_gifts(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"gifts": [gift for gift in self.gifts.values() if gift["remaining_count"] != 0]}
+
+    async def send_gift(self, params: Dict[str, Any]) -> bool:
+        gift_id = params.get("gift_id")
+        recipient = params.get("user_id") or params.get("chat_id")
+        gift = self.gifts.get(gift_id)
+        if gift is None:
+            raise ApiError(400, "Bad Request: STARGIFT_INVALID")
+        if gift["remaining_count"] == 0:
+            raise ApiError(400, "Bad Request: STARGIFT_USAGE_LIMITED")
+        if self.star_balance is not None:
+            if self.star_balance < gift["star_count"]:
+                raise ApiError(400, "Bad Request: BALANCE_TOO_LOW")
+            self.star_balance -= gift["star_count"]
+        if gift["remaining_count"] is not None:
+            gift["remaining_count"] -= 1
+
+        self.log.append({
+            "method": "sendGift",
+            "at": self.elapsed(),
+            "gift_id": gift_id,
+            "user_id": int(recipient),
+            "price": gift["star_count"],
+        })
+        return True
+
+    async def send_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params["chat_id"])
+        self.log.append({"method": "sendMessage", "at": self.elapsed(), "chat_id": chat_id, "text": params.get("text", "")})
+        message_id = self.next_message_id
+        self.next_message_id += 1
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+
+    async def create_invoice_link(self, params: Dict[str, Any]) -> str:
+        return f"https://t.me/$fake_invoice_{self.rng.getrandbits(64):x}"
+
+    async def refund_star_payment(self, params: Dict[str, Any]) -> bool:
+        if not params.get("telegram_payment_charge_id"):
+            raise ApiError(400, "Bad Request: CHARGE_ID_EMPTY")
+        return True
+
+    async def get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = min(float(params.get("timeout") or 0), 30)
+
+        # Подтвержденные апдейты больше не нужны
+        self.updates = [update for update in self.updates if update["update_id"] >= offset]
+        if not self.updates and timeout:
+            self.updates_event.clear()
+            try:
+                await asyncio.wait_for(self.updates_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.updates[:limit]
+
+    async def get_me(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return BOT_USER
+
+    # HTTP
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        handler = {
+            "getAvailableGifts": self.get_available_gifts,
+            "sendGift": self.send_gift,
+            "sendMessage": self.send_message,
+            "createInvoiceLink": self.create_invoice_link,
+            "refundStarPayment": self.refund_star_payment,
+            "getUpdates": self.get_updates,
+            "getMe": self.get_me,
+        }.get(method)
+
+        stats = self.stats[method]
+        stats["requests"] += 1
+        try:
+            if handler is None and method not in TRUE_METHODS:
+                raise ApiError(404, "Not Found: method not found")
+            params = await self._params(request)
+            self.advance()
+            if method != "getUpdates":
+                await self._simulate(method)
+            result = await handler(params) if handler else True
+        except ApiError as e:
+            stats["errors"] += 1
+            return e.to_response()
+        return web.json_response({"ok": True, "result": result})
+
+    async def _params(self, request: web.Request) -> Dict[str, Any]:
+        if request.content_type == "application/json":
+            return await request.json()
+        form = await request.post()
+        return {key: value for key, value in form.items() if isinstance(value, str)}
+
+    async def handle_log(self, request: web.Request) -> web.Response:
+        return web.json_response(self.log)
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "elapsed": self.elapsed(),
+            "star_balance": self.star_balance,
+            "methods": self.stats,
+            "gifts": list(self.gifts.values()),
+        })
+
+    async def handle_drop(self, request: web.Request) -> web.Response:
+        spec = await request.json()
+        self.gifts[spec["id"]] = make_gift(spec)
+        logger.info(f"Дроп подарка {spec['id']} по запросу")
+        return web.json_response({"ok": True})
+
+    async def handle_updates(self, request: web.Request) -> web.Response:
+        for update in await request.json():
+            update["update_id"] = self.next_update_id
+            self.next_update_id += 1
+            self.updates.append(update)
+        self.updates_event.set()
+        return web.json_response({"ok": True})
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.log.clear()
+        self.stats.clear()
+        return web.json_response({"ok": True})
+
+
+def create_app(scenario: Optional[Dict[str, Any]] = None, seed: Optional[int] = None) -> web.Application:
+    """Создать aiohttp-приложение фейкового Bot API"""
+    api = FakeBotApi(scenario or DEFAULT_SCENARIO, seed)
+    app = web.Application()
+    app["api"] = api
+    app.router.add_get("/_fake/log", api.handle_log)
+    app.router.add_get("/_fake/stats", api.handle_stats)
+    app.router.add_post("/_fake/drop", api.handle_drop)
+    app.router.add_post("/_fake/updates", api.handle_updates)
+    app.router.add_post("/_fake/reset", api.handle_reset)
+    app.router.add_route("*", "/bot{token}/{method}", api.handle)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--scenario", help="JSON-файл сценария")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    scenario = None
+    if args.scenario:
+        with open(args.scenario, encoding="utf-8") as file:
+            scenario = json.load(file)
+
+    web.run_app(create_app(scenario, args.seed), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
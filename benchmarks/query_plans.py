@@ -0,0 +1,119 @@
+"""Проверка планов горячих запросов CRUD
+
+Заполняет синтетическую БД, выполняет функции CRUD, перехватывает их SQL и
+прогоняет через EXPLAIN (EXPLAIN QUERY PLAN в SQLite). Каждый запрос
+должен использовать ожидаемый индекс, иначе скрипт завершается с кодом 1.
+
+На PostgreSQL последовательное сканирование отключается на время EXPLAIN:
+на маленькой таблице планировщик и так выбрал бы seq scan, а проверяется,
+что индекс вообще применим.
+
+Запуск: python -m benchmarks.query_plans [--users 2000] [--database-url postgresql+asyncpg://...]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from typing import Any, Awaitable, Callable, List, Tuple
+
+
+async def explain(conn: Any, statement: str, parameters: Any) -> str:
+    """План запроса одной строкой"""
+    if conn.dialect.name == "postgresql":
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        return "\n".join(row[0] for row in result.all())
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return "\n".join(row[-1] for row in result.all())
+
+
+async def run_checks(args: argparse.Namespace) -> bool:
+    from loguru import logger
+    from sqlalchemy import event, select
+
+    from benchmarks.drop_latency import seed_database
+    from app.database.crud.auto_purchase import get_user_settings
+    from app.database.crud.gift_sql import get_active_purchase_settings
+    from app.database.crud.outbox import claim_pending_purchases
+    from app.database.crud.user import get_transaction, update_user_balance
+    from app.database.engine import engine, get_session
+    from app.database.models import Base, BalanceHistory
+
+    logger.remove()
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+    await seed_database(args.users, seed=42)
+    user_id = 1_000_000 + args.users // 2
+    for index in range(20):
+        await update_user_balance(user_id + index, 100, f"charge-{index}")
+
+    captured: List[Tuple[str, Any]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    async def history() -> None:
+        # Запрос, под который заведен индекс по истории пользователя
+        async with get_session() as session:
+            await session.execute(
+                select(BalanceHistory)
+                .where(BalanceHistory.user_id == user_id)
+                .order_by(BalanceHistory.timestamp.desc())
+            )
+
+    # (название, вызов, фрагмент SQL нужного запроса, допустимые индексы)
+    checks: List[Tuple[str, Callable[[], Awaitable[Any]], str, Tuple[str, ...]]] = [
+        ("get_active_purchase_settings", get_active_purchase_settings,
+         "FROM auto_purchase_settings JOIN users", ("ix_auto_purchase_settings_enabled",)),
+        ("get_user_settings", lambda: get_user_settings(user_id),
+         "FROM auto_purchase_settings", ("ix_auto_purchase_settings_user_id",)),
+        ("get_transaction", lambda: get_transaction("charge-3"),
+         "FROM balance_history", ("ix_balance_history_telegram_payment_charge_id",)),
+        ("balance history", history,
+         "FROM balance_history", ("ix_balance_history_user_id_timestamp",)),
+        ("claim_pending_purchases", lambda: claim_pending_purchases(user_id),
+         "UPDATE purchase_outbox", ("ix_purchase_outbox_user_id", "ix_purchase_outbox_state")),
+    ]
+
+    ok = True
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    for name, call, fragment, indexes in checks:
+        captured.clear()
+        await call()
+        statements = [(statement, parameters) for statement, parameters in captured if fragment in statement]
+        if not statements:
+            print(f"FAIL {name}: запрос с '{fragment}' не выполнялся")
+            ok = False
+            continue
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        async with engine.connect() as conn:
+            plan = await explain(conn, *statements[0])
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        used = any(index in plan for index in indexes)
+        ok = ok and used
+        print(f"{'ok  ' if used else 'FAIL'} {name}: ожидается {' или '.join(indexes)}")
+        if not used or args.verbose:
+            print("     " + plan.replace("\n", "\n     "))
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    await engine.dispose()
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--database-url", help="Тестовая база (по умолчанию временная SQLite), таблицы пересоздаются")
+    parser.add_argument("--verbose", action="store_true", help="Печатать все планы")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{directory}/plans.sqlite3"
+        os.environ.setdefault("BOT_TOKEN", "123456:benchmark")
+        ok = asyncio.run(run_checks(args))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Бенчмарк поиска подписчиков подарка: индекс против полного перебора
+
+Запуск: python -m benchmarks.subscription_index [--users 100000]
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from loguru import logger
+
+from app.services.subscription_index import SubscriptionIndex
+
+# Значения кнопок из app/keyboards/auto_purchase_kb.py
+PRICES = [15, 25, 50, 100, 200, 500, 1000, 2000, 2500, 3000, 5000, 10000, 20000]
+SUPPLY_LIMITS = [500, 1000, 1500, 2000, 3000, 5000, 7500, 10000, 15000, 25000, 50000, 100000, 250000]
+
+
+def make_settings(count: int, seed: int = 42) -> list:
+    """Сгенерировать настройки со значениями, доступными в кнопках"""
+    rng = random.Random(seed)
+    rows = []
+    for user_id in range(count):
+        min_price = rng.choice([0] + PRICES)
+        max_price = rng.choice([0] + [price for price in PRICES if price >= min_price])
+        rows.append(SimpleNamespace(
+            user_id=user_id,
+            is_enabled=True,
+            min_price=min_price,
+            max_price=max_price,
+            supply_limit=rng.choice([0] + SUPPLY_LIMITS)
+        ))
+    return rows
+
+
+def scan(rows: list, price: int, total_count: int) -> set:
+    """Полный перебор, как в старом _filter_gifts_for_user"""
+    return {
+        row.user_id for row in rows
+        if not (row.min_price > 0 and price < row.min_price)
+        and not (row.max_price > 0 and price > row.max_price)
+        and not (row.supply_limit > 0 and total_count > row.supply_limit)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    logger.remove()
+    rows = make_settings(args.users)
+    gifts = [(15, 500), (50, 3000), (500, 10000), (2500, 50000), (20000, 250000)]
+
+    index = SubscriptionIndex()
+    started = time.perf_counter()
+    index.load(rows)
+    print(f"build: {args.users} users in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    for price, total_count in gifts:
+        assert index.match(price, total_count) == scan(rows, price, total_count)
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            matched = index.match(price, total_count)
+        index_ms = (time.perf_counter() - started) * 1000 / args.repeat
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            scan(rows, price, total_count)
+        scan_ms = (time.perf_counter() - started) * 1000 / args.repeat
+
+        print(
+            f"gift price={price} supply={total_count}: matched {len(matched)}, "
+            f"index {index_ms:.2f} ms, scan {scan_ms:.2f} ms"
+        )
+
+    started = time.perf_counter()
+    for row in rows[:1000]:
+        index.upsert(row.user_id, True, row.min_price, 0, 0)
+    print(f"upsert: {(time.perf_counter() - started) * 1000 / 1000:.4f} ms per update")
+
+
+if __name__ == "__main__":
+    main()
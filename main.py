@@ -6,7 +6,11 @@ from app.loader import dp, bot
 from app.services.commands import set_default_commands
 from app.handlers import get_handlers_router
 from app.database.engine import init_db
+from app.database.crud.user import reconcile_total_balance, run_total_balance_reconciler
 from app.services.gifts import GiftService
+from app.services.sniper import SniperMode, SniperProcess
+from app.config import settings
+from app.services.metrics import instrument_router, start_metrics_server
 
 
 
@@ -14,15 +18,32 @@ from app.services.gifts import GiftService
 async def main():
     # Инициализируем базу данных
     await init_db()
+    await reconcile_total_balance()
+    balance_reconciler = asyncio.create_task(run_total_balance_reconciler(settings.TOTAL_BALANCE_RECONCILE_INTERVAL))
     
     # Добавляем роутеры и команды
-    dp.include_router(get_handlers_router())
+    handlers_router = get_handlers_router()
+    if settings.METRICS_ENABLED:
+        instrument_router(handlers_router)
+        await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT)
+    dp.include_router(handlers_router)
     await set_default_commands(dp)
     
     # Удаляем веб-хук и пишем лог
     await bot.delete_webhook(drop_pending_updates=True)
     logger.debug("Bot started!")
     
+    if settings.SNIPER_MODE == SniperMode.PROCESS:
+        # Покупка подарков в отдельном процессе, изменения настроек и балансов идут через IPC
+        sniper = SniperProcess(settings.IPC_SOCKET_PATH)
+        logger.debug("Gift sniper process created!")
+
+        await asyncio.gather(
+            dp.start_polling(bot),
+            sniper.run()
+        )
+        return
+
     # Создаем сервис подарков
     gift_service = GiftService()
     logger.debug("Gift service created!")
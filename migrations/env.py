@@ -1,7 +1,9 @@
+import asyncio
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
 
 from alembic import context
 
@@ -9,7 +11,7 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from app.models.base import Base
+from app.database.models import Base
 from app.config import settings
 
 # this is the Alembic Config object, which provides
@@ -25,17 +27,21 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
-# other values from the config, defined by the needs of env.py,
-# can be acquired:
-# my_important_option = config.get_main_option("my_important_option")
-# ... etc.
 
-def get_url():
-    # Для alembic нужен sync драйвер
-    url = settings.DATABASE_URL
-    if url.startswith("sqlite+aiosqlite"):
-        url = url.replace("sqlite+aiosqlite", "sqlite")
-    return url
+def get_url() -> str:
+    # Тот же async URL, что и у бота: sqlite+aiosqlite или postgresql+asyncpg
+    return settings.DATABASE_URL
+
+
+def configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        # SQLite не умеет ALTER COLUMN, batch-режим пересоздает таблицу
+        render_as_batch=get_url().startswith("sqlite"),
+        compare_type=True,
+        **kwargs
+    )
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -49,10 +55,8 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = get_url()
-    context.configure(
-        url=url,
-        target_metadata=target_metadata,
+    configure(
+        url=get_url(),
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -61,31 +65,29 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
-def run_migrations_online() -> None:
+def do_run_migrations(connection: Connection) -> None:
+    configure(connection=connection)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online() -> None:
     """Run migrations in 'online' mode.
 
-    In this scenario we need to create an Engine
-    and associate a connection with the context.
+    Миграции идут через async драйвер приложения, отдельный sync драйвер
+    не нужен.
 
     """
-    configuration = config.get_section(config.config_ini_section)
-    configuration["sqlalchemy.url"] = get_url()
-    connectable = engine_from_config(
-        configuration,
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
+    connectable = create_async_engine(get_url(), poolclass=pool.NullPool)
 
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
-        )
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
 
-        with context.begin_transaction():
-            context.run_migrations()
+    await connectable.dispose()
 
 
 if context.is_offline_mode():
     run_migrations_offline()
 else:
-    run_migrations_online()
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,74 @@
+"""Purchase outbox and BIGINT user ids
+
+Revision ID: 3b9d2e7c41a6
+Revises: f75b8c904508
+Create Date: 2026-10-17 10:40:00.000000
+
+ID пользователей Telegram не помещаются в INTEGER PostgreSQL. В SQLite
+INTEGER и так 64-битный, поэтому там меняется только outbox.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2e7c41a6'
+down_revision: Union[str, None] = 'f75b8c904508'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Колонки с ID пользователей Telegram
+USER_ID_COLUMNS = (
+    ('users', 'user_id'),
+    ('auto_purchase_settings', 'user_id'),
+    ('balance_history', 'user_id'),
+)
+
+TelegramId = sa.BigInteger().with_variant(sa.Integer(), 'sqlite')
+
+
+def existing_tables() -> set:
+    """Уже существующие таблицы (в offline-режиме база считается пустой)"""
+    if op.get_context().as_sql:
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, column in USER_ID_COLUMNS:
+            op.alter_column(table, column, type_=sa.BigInteger(), existing_type=sa.Integer())
+
+    if 'purchase_outbox' not in existing_tables():
+        op.create_table('purchase_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('round_id', sa.String(), nullable=True),
+        sa.Column('user_id', TelegramId, nullable=True),
+        sa.Column('gift_id', sa.String(), nullable=True),
+        sa.Column('price', sa.Integer(), nullable=True),
+        sa.Column('cycle', sa.Integer(), nullable=True),
+        sa.Column('state', sa.String(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_purchase_outbox_round_id'), 'purchase_outbox', ['round_id'], unique=False)
+        op.create_index(op.f('ix_purchase_outbox_state'), 'purchase_outbox', ['state'], unique=False)
+        op.create_index(op.f('ix_purchase_outbox_user_id'), 'purchase_outbox', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_purchase_outbox_user_id'), table_name='purchase_outbox')
+    op.drop_index(op.f('ix_purchase_outbox_state'), table_name='purchase_outbox')
+    op.drop_index(op.f('ix_purchase_outbox_round_id'), table_name='purchase_outbox')
+    op.drop_table('purchase_outbox')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, column in USER_ID_COLUMNS:
+            op.alter_column(table, column, type_=sa.Integer(), existing_type=sa.BigInteger())
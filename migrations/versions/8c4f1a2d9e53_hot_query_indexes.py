@@ -0,0 +1,61 @@
+"""Indexes for hot queries
+
+Revision ID: 8c4f1a2d9e53
+Revises: 3b9d2e7c41a6
+Create Date: 2026-10-17 11:00:00.000000
+
+Уникальные индексы не создаются поверх дублей: миграция останавливается и
+называет таблицу, дубли нужно разобрать вручную.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4f1a2d9e53'
+down_revision: Union[str, None] = '3b9d2e7c41a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя, таблица, колонки, уникальный)
+INDEXES = (
+    ('ix_auto_purchase_settings_user_id', 'auto_purchase_settings', ['user_id'], True),
+    ('ix_auto_purchase_settings_enabled', 'auto_purchase_settings', ['is_enabled', 'user_id'], False),
+    ('ix_balance_history_telegram_payment_charge_id', 'balance_history', ['telegram_payment_charge_id'], True),
+    ('ix_balance_history_user_id_timestamp', 'balance_history', ['user_id', 'timestamp'], False),
+)
+
+
+def existing_indexes(table: str) -> set:
+    """Уже существующие индексы таблицы (в offline-режиме их нет)"""
+    if op.get_context().as_sql:
+        return set()
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def check_duplicates(table: str, column: str) -> None:
+    if op.get_context().as_sql:
+        return
+    duplicates = op.get_bind().execute(sa.text(
+        f'SELECT {column}, COUNT(*) FROM {table} WHERE {column} IS NOT NULL '
+        f'GROUP BY {column} HAVING COUNT(*) > 1 LIMIT 5'
+    )).all()
+    if duplicates:
+        raise RuntimeError(f'{table}.{column} has duplicates, resolve them before upgrading: {duplicates}')
+
+
+def upgrade() -> None:
+    for name, table, columns, unique in INDEXES:
+        if name in existing_indexes(table):
+            continue
+        if unique:
+            check_duplicates(table, columns[0])
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,39 @@
+"""Maintained total balance
+
+Revision ID: d27a6f0b3c18
+Revises: 8c4f1a2d9e53
+Create Date: 2026-10-17 11:20:00.000000
+
+Сумма балансов заполняется из SUM(balance), дальше ее ведет CRUD.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd27a6f0b3c18'
+down_revision: Union[str, None] = '8c4f1a2d9e53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql or 'balance_totals' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('balance_totals',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.execute(
+        "INSERT INTO balance_totals (id, total, updated_at) "
+        "SELECT 1, COALESCE(SUM(balance), 0), CURRENT_TIMESTAMP FROM users "
+        "WHERE NOT EXISTS (SELECT 1 FROM balance_totals WHERE id = 1)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('balance_totals')
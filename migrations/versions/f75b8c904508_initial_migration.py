@@ -4,6 +4,9 @@ Revision ID: f75b8c904508
 Revises: 
 Create Date: 2025-06-14 14:34:29.387438
 
+Базовые таблицы бота. Таблицы, уже созданные init_db, не пересоздаются,
+поэтому миграцию можно применять к существующей базе.
+
 """
 from typing import Sequence, Union
 
@@ -18,41 +21,48 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+def existing_tables() -> set:
+    """Уже существующие таблицы (в offline-режиме база считается пустой)"""
+    if op.get_context().as_sql:
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
 def upgrade() -> None:
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_table('auto_purchase_settings')
-    op.drop_table('users')
-    op.drop_table('balance_history')
-    # ### end Alembic commands ###
+    existing = existing_tables()
+    if 'users' not in existing:
+        op.create_table('users',
+        sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('balance', sa.Integer(), nullable=True),
+        sa.Column('admin', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id')
+        )
+    if 'auto_purchase_settings' not in existing:
+        op.create_table('auto_purchase_settings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('is_enabled', sa.Boolean(), nullable=True),
+        sa.Column('min_price', sa.Integer(), nullable=True),
+        sa.Column('max_price', sa.Integer(), nullable=True),
+        sa.Column('supply_limit', sa.Integer(), nullable=True),
+        sa.Column('purchase_cycles', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'balance_history' not in existing:
+        op.create_table('balance_history',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('amount', sa.Integer(), nullable=True),
+        sa.Column('telegram_payment_charge_id', sa.String(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
 
 
 def downgrade() -> None:
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.create_table('balance_history',
-    sa.Column('id', sa.INTEGER(), nullable=False),
-    sa.Column('user_id', sa.INTEGER(), nullable=True),
-    sa.Column('amount', sa.INTEGER(), nullable=True),
-    sa.Column('telegram_payment_charge_id', sa.VARCHAR(), nullable=True),
-    sa.Column('timestamp', sa.DATETIME(), nullable=True),
-    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_table('users',
-    sa.Column('user_id', sa.INTEGER(), nullable=False),
-    sa.Column('username', sa.VARCHAR(), nullable=True),
-    sa.Column('balance', sa.INTEGER(), nullable=True),
-    sa.Column('admin', sa.BOOLEAN(), nullable=True),
-    sa.PrimaryKeyConstraint('user_id')
-    )
-    op.create_table('auto_purchase_settings',
-    sa.Column('id', sa.INTEGER(), nullable=False),
-    sa.Column('user_id', sa.INTEGER(), nullable=True),
-    sa.Column('is_enabled', sa.BOOLEAN(), nullable=True),
-    sa.Column('min_price', sa.INTEGER(), nullable=True),
-    sa.Column('max_price', sa.INTEGER(), nullable=True),
-    sa.Column('supply_limit', sa.INTEGER(), nullable=True),
-    sa.Column('purchase_cycles', sa.INTEGER(), nullable=True),
-    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
-    sa.PrimaryKeyConstraint('id')
-    )
-    # ### end Alembic commands ###
+    op.drop_table('balance_history')
+    op.drop_table('auto_purchase_settings')
+    op.drop_table('users')